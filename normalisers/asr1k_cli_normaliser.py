@@ -15,7 +15,11 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import logging
-from .iosxe_cli_normaliser import Iosxe_Cli_Normaliser
+from .iosxe_cli_normaliser import Iosxe_Cli_Normaliser, _ParsedSensor
+from .normaliser import _lower, _try_float
+
+# Substrings identifying PSU voltage and current sensors, in match order
+_POWER_SENSORS = ('vout', 'vin', 'iout', 'iin')
 
 class Asr1k_Cli_Normaliser(Iosxe_Cli_Normaliser):
 
@@ -28,126 +32,115 @@ class Asr1k_Cli_Normaliser(Iosxe_Cli_Normaliser):
     def normalise(self, sites, device_config, command_data):
         return super().normalise(sites, device_config, command_data)
     
-    def _parse_assets(self, command_data):
-        return super()._parse_assets(command_data)
+    def _parse_assets(self, inventory_output):
+        return super()._parse_assets(inventory_output)
     
-    def _parse_interfaces(self, command_data):
-        return super()._parse_interfaces(command_data)
+    def _parse_interfaces(self, interfaces_output, ifindex_output):
+        return super()._parse_interfaces(interfaces_output, ifindex_output)
     
-    def _parse_sensors(self, command_data):
+    def _parse_sensors(self, environment_output, cpu_output, memory_output):
         sensor_data = []
-        sensor_data.extend(self._parse_power_textfsm(command_data))
-        sensor_data.extend(self._parse_cpu_textfsm(command_data))
-        sensor_data.extend(self._parse_memory_textfsm(command_data))
+        sensor_data.extend(self._parse_power_textfsm(environment_output))
+        sensor_data.extend(self._parse_cpu_textfsm(cpu_output))
+        sensor_data.extend(self._parse_memory_textfsm(memory_output))
         return sensor_data
 
-    def _parse_power_textfsm(self, command_data):
-        tokenized = self._tokenize_fsm(command_data['show-environment'], 'asr1k_show_environment.fsm')
+    def _parse_power_textfsm(self, environment_output):
+        tokenized = self._tokenize_fsm(environment_output, 'asr1k_show_environment.fsm')
         sensor_data = []
-        vout_dict = {}
-        vin_dict = {}
-        iout_dict = {}
-        iin_dict = {}
+        # Per slot readings of each PSU voltage/current sensor, keyed by _POWER_SENSORS
+        power_readings = {tag: {} for tag in _POWER_SENSORS}
         for sensor in tokenized:
-            try:
-                sensor_reading = float(sensor['READING'])
-            except:
-                logging.debug(f"Error extracted sensor reading {sensor['READING']} is not a number")
+            raw_reading = sensor['READING']
+            sensor_reading = _try_float(raw_reading)
+            if sensor_reading is None:
+                logging.debug(f"Error extracted sensor reading {raw_reading} is not a number")
                 continue
 
             sensor_location = sensor['SLOT']
+            raw_sensor = sensor['SENSOR']
+            sensor_kind = _lower(raw_sensor)
+
+            power_tag = None
+            for tag in _POWER_SENSORS:
+                if tag in sensor_kind:
+                    power_tag = tag
+                    break
 
-            if 'vout' in sensor['SENSOR'].lower():
-                sensor_name = 'Vout'
-                sensor_units = 'V'
-                vout_dict[sensor_location] = sensor_reading
-            elif 'vin' in sensor['SENSOR'].lower():
-                sensor_name = 'Vin'
-                sensor_units = 'V'
-                vin_dict[sensor_location] = sensor_reading
-            elif 'iout' in sensor['SENSOR'].lower():
-                sensor_name = 'Iout'
-                sensor_units = 'A'
-                iout_dict[sensor_location] = sensor_reading
-            elif 'iin' in sensor['SENSOR'].lower():
-                sensor_name = 'Iin'
-                sensor_units = 'A'
-                iin_dict[sensor_location] = sensor_reading
+            if power_tag:
+                power_readings[power_tag][sensor_location] = sensor_reading
             else:
-                sensor_name = sensor['SENSOR']
-                sensor_units = sensor['UNITS']
                 # Only add non-power sensors as there will already be the chassis level power
-                sensor_i = {
-                        'name': sensor_name,
-                        'state': sensor['STATE'],
-                        'reading': sensor_reading,
-                        'units': sensor_units,
-                        'location': sensor_location
-                    }
+                sensor_i = _ParsedSensor(
+                        name = raw_sensor,
+                        state = sensor['STATE'],
+                        reading = sensor_reading,
+                        units = sensor['UNITS'],
+                        location = sensor_location
+                    )
                 sensor_data.append(sensor_i)
 
         logging.debug(sensor_data)
-        power_sensors = self._generate_chassis_power_from_vi(vout_dict, vin_dict, iout_dict, iin_dict)
+        power_sensors = self._generate_chassis_power_from_vi(power_readings['vout'], power_readings['vin'],
+                                                             power_readings['iout'], power_readings['iin'])
         sensor_data.extend(power_sensors)
         logging.debug(sensor_data)
 
         return sensor_data
     
-    def _parse_cpu_textfsm(self, command_data):
-        return super()._parse_cpu_textfsm(command_data)
+    def _parse_cpu_textfsm(self, cpu_output):
+        return super()._parse_cpu_textfsm(cpu_output)
     
-    def _parse_memory_textfsm(self, command_data):
-        return super()._parse_memory_textfsm(command_data)
+    def _parse_memory_textfsm(self, memory_output):
+        return super()._parse_memory_textfsm(memory_output)
     
     def _generate_chassis_power_from_vi(self, vout_dict, vin_dict, iout_dict, iin_dict):
         chassis_total_power_out = 0
         chassis_total_power_in = 0
         power_sensors = []
-        while len(iout_dict) != 0:
-            sensor_location = list(iout_dict.keys())[0]
-            vout_reading = vout_dict.pop(sensor_location, 0)
-            iout_reading = iout_dict.pop(sensor_location, 0)
+        for sensor_location, iout_reading in iout_dict.items():
+            vout_reading = vout_dict.get(sensor_location, 0)
             if vout_reading == 0:
                 logging.warning(f"Vout at power slot {sensor_location} is 0.")
             if iout_reading == 0:
                 logging.warning(f"Iout at power slot {sensor_location} is 0.")
             chassis_total_power_out += vout_reading * iout_reading
 
-        while len(iin_dict) != 0:
-            sensor_location = list(iin_dict.keys())[0]
-            vin_reading = vin_dict.pop(sensor_location, 0)
-            iin_reading = iin_dict.pop(sensor_location, 0)
+        for sensor_location, iin_reading in iin_dict.items():
+            vin_reading = vin_dict.get(sensor_location, 0)
             if vin_reading == 0:
                 logging.warning(f"Vin at power slot {sensor_location} is 0.")
             if iin_reading == 0:
                 logging.warning(f"Iin at power slot {sensor_location} is 0.")
             chassis_total_power_in += vin_reading * iin_reading
 
-        if vout_dict:
-            logging.warning(f"Vout locations {list(vout_dict.keys())} have no corresponding Iout")
-        if vin_dict:
-            logging.warning(f"Vin locations {list(vin_dict.keys())} have no corresponding Iin")
+        unmatched_vout = vout_dict.keys() - iout_dict.keys()
+        if unmatched_vout:
+            logging.warning(f"Vout locations {list(unmatched_vout)} have no corresponding Iout")
+        unmatched_vin = vin_dict.keys() - iin_dict.keys()
+        if unmatched_vin:
+            logging.warning(f"Vin locations {list(unmatched_vin)} have no corresponding Iin")
 
         if int(chassis_total_power_out) != 0:
-            sensor_chassis_pout = {
-                    'location': 'Chassis',
-                    'reading': chassis_total_power_out,
-                    'units': 'W',
-                    'state': 'NA',
-                    'name': 'Pout'
-                    }
+            sensor_chassis_pout = _ParsedSensor(
+                    location = 'Chassis',
+                    reading = chassis_total_power_out,
+                    units = 'W',
+                    state = 'NA',
+                    name = 'Pout'
+                    )
             power_sensors.append(sensor_chassis_pout)
         else:
             logging.debug("Chassis Pout is 0. Skipping sensor data.")
 
         if int(chassis_total_power_in) != 0:
-            sensor_chassis_pin = {
-                    'location': 'Chassis',
-                    'reading': chassis_total_power_in,
-                    'units': 'W',
-                    'state': 'NA',
-                    'name': 'Pin'
-                    }
+            sensor_chassis_pin = _ParsedSensor(
+                    location = 'Chassis',
+                    reading = chassis_total_power_in,
+                    units = 'W',
+                    state = 'NA',
+                    name = 'Pin'
+                    )
             power_sensors.append(sensor_chassis_pin)
         else:
             logging.debug("Chassis Pin is 0. Skipping sensor data.")
@@ -15,7 +15,32 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import logging
-from .iosxe_cli_normaliser import Iosxe_Cli_Normaliser
+from .iosxe_cli_normaliser import Iosxe_Cli_Normaliser, _ParsedSensor
+from .normaliser import _lower, _try_float
+
+# Maps reported temperature sensor states to POWEFF sensor states
+_STATE_MAP = {
+    'normal': 'Normal',
+    'good': 'Normal',
+    'green': 'Normal',
+    'yellow': 'Warning',
+    'red': 'Critical'
+}
+
+def _to_watts(units, reading):
+    """
+    Converts a power reading to Watts
+    Parameters:
+        units: lowercase units of the reading
+        reading: numerical reading
+    Returns:
+        reading in Watts, None if units are neither Watts nor mW
+    """
+    if 'mw' in units:
+        return reading / 1000
+    if units in ('w', 'watt', 'watts'):
+        return reading
+    return None
 
 class Cat9300_Cli_Normaliser(Iosxe_Cli_Normaliser):
 
@@ -35,138 +60,103 @@ class Cat9300_Cli_Normaliser(Iosxe_Cli_Normaliser):
     def normalise(self, sites, device_config, command_data):
         return super().normalise(sites, device_config, command_data)
 
-    def _parse_assets(self, command_data):
-        return super()._parse_assets(command_data)
+    def _parse_assets(self, inventory_output):
+        return super()._parse_assets(inventory_output)
 
-    def _parse_interfaces(self, command_data):
-        return super()._parse_interfaces(command_data)
+    def _parse_interfaces(self, interfaces_output, ifindex_output):
+        return super()._parse_interfaces(interfaces_output, ifindex_output)
+
+    def _parse_sensors(self, environment_output, cpu_output, memory_output):
+        # Power and temperature sensors share the same output, tokenize it only once
+        show_environment = self._tokenize_fsm(environment_output, 'catalyst9k_show_env_all.fsm')
+        logging.debug(show_environment)
 
-    def _parse_sensors(self, command_data):
         sensor_data = []
-        sensor_data.extend(self._parse_power_cat9k(command_data))
-        sensor_data.extend(self._parse_cpu_textfsm(command_data))
-        sensor_data.extend(self._parse_memory_textfsm(command_data))
-        sensor_data.extend(self._parse_temperature_textfsm(command_data))
+        sensor_data.extend(self._parse_power_cat9k(show_environment))
+        sensor_data.extend(self._parse_cpu_textfsm(cpu_output))
+        sensor_data.extend(self._parse_memory_textfsm(memory_output))
+        sensor_data.extend(self._parse_temperature_textfsm(show_environment))
         return sensor_data
 
-    def _parse_power_cat9k(self, command_data):
+    def _parse_power_cat9k(self, show_environment):
         sensor_data = []
 
-        show_environment = self._tokenize_fsm(command_data.get('show-environment', ''),
-                                                       'catalyst9k_show_env_all.fsm')
-        logging.debug(show_environment)
-
-        chassis_total_power_out = 0
-        chassis_total_power_in = 0
-
-        for sensor in show_environment:
-            try:
-                sensor_reading = float(sensor['READING'])
-            except:
-                logging.error(f"Sensor reading {sensor['READING']} is not numerical")
-            
-            sensor_location = sensor['NAME']
-
-            if 'mw' in sensor['UNITS'].lower():
-                sensor_reading /= 1000
-                sensor_units = 'W'
-            elif sensor['UNITS'].lower() in ('w', 'watt', 'watts'):
-                sensor_units = 'W'
-            else:
-                logging.debug(f"Skipping sensor {sensor}. Units not in Watts or mW")
-                continue
-
-            if 'powin' in sensor['SENSOR'].lower():
-                sensor_name = 'Pin'
-                chassis_total_power_in += sensor_reading
-            elif 'powout' in sensor['SENSOR'].lower():
-                sensor_name = 'Pout'
-                chassis_total_power_out += sensor_reading
-            else:
-                logging.debug(f"Skipping sensor {sensor}. Is not POWin or POWout or Power")
-                continue
+        # (sensor, units, reading) of every row carrying a numerical reading
+        readings = [(_lower(sensor['SENSOR']), _lower(sensor['UNITS']), reading)
+                    for sensor in show_environment
+                    if (reading := _try_float(sensor['READING'])) is not None]
 
-            sensor = {
-                'location': sensor_location,
-                'name': sensor_name,
-                'state': sensor['STATE'],
-                'reading': sensor_reading,
-                'units': sensor_units
-            }
+        # Sensors not reported in Watts or mW are skipped
+        chassis_total_power_in = sum(watts for kind, units, reading in readings
+                                     if 'powin' in kind and (watts := _to_watts(units, reading)) is not None)
+        chassis_total_power_out = sum(watts for kind, units, reading in readings
+                                      if 'powout' in kind and (watts := _to_watts(units, reading)) is not None)
 
         if int(chassis_total_power_out) != 0:
-            sensor_chassis_pout = {
-                    'location': 'Chassis',
-                    'reading': chassis_total_power_out,
-                    'units': 'W',
-                    'state': 'NA',
-                    'name': 'Pout'
-                    }
+            sensor_chassis_pout = _ParsedSensor(
+                    location = 'Chassis',
+                    reading = chassis_total_power_out,
+                    units = 'W',
+                    state = 'NA',
+                    name = 'Pout'
+                    )
             sensor_data.append(sensor_chassis_pout)
         else:
             logging.debug("Chassis Pout is 0. Skipping sensor data.")
 
         if int(chassis_total_power_in) != 0:
-            sensor_chassis_pin = {
-                    'location': 'Chassis',
-                    'reading': chassis_total_power_in,
-                    'units': 'W',
-                    'state': 'NA',
-                    'name': 'Pin'
-                    }
+            sensor_chassis_pin = _ParsedSensor(
+                    location = 'Chassis',
+                    reading = chassis_total_power_in,
+                    units = 'W',
+                    state = 'NA',
+                    name = 'Pin'
+                    )
             sensor_data.append(sensor_chassis_pin)
         else:
             logging.debug("Chassis Pin is 0. Skipping sensor data.")
 
         return sensor_data
 
-    def _parse_temperature_textfsm(self, command_data):
+    def _parse_temperature_textfsm(self, show_environment):
         logging.info("Parsring Temperature")
 
         sensor_data = []
 
-        show_environment = self._tokenize_fsm(command_data.get('show-environment', ''),
-                                                       'catalyst9k_show_env_all.fsm')
-        logging.debug(show_environment)
-
-
-        for sensor in show_environment:
-            try:
-                sensor_reading = float(sensor['READING'])
-            except:
-                logging.error(f"Sensor reading {sensor['READING']} is not numerical")
+        # Cheap substring test first, only inlet sensors are worth parsing
+        inlet_sensors = [sensor for sensor in show_environment if 'inlet' in _lower(sensor['SENSOR'])]
+        if not inlet_sensors:
+            logging.debug("No inlet temperature sensors reported")
+            return sensor_data
+
+        for sensor in inlet_sensors:
+            raw_reading = sensor['READING']
+            sensor_reading = _try_float(raw_reading)
+            if sensor_reading is None:
+                logging.error(f"Sensor reading {raw_reading} is not numerical")
                 continue
 
             sensor_location = sensor['SENSOR']
-            if 'inlet' not in sensor_location.lower():
-                logging.debug(f"Skipping sensor {sensor}. Is not inlet")
-                continue
-            sensor_state = sensor['STATE']
-            if sensor_state.lower().strip() in ("normal", "good", "green"):
-                sensor_state = "Normal"
-            elif sensor_state.lower().strip() in ("yellow"):
-                sensor_state = "Warning"
-            elif sensor_state.lower().strip() in ("red"):
-                sensor_state = "Critical"
-            else:
-                logging.warning(f"Unable to identify Inlet temperature sensor state is '{sensor_state}'")
-                sensor_state = sensor['STATE']
-
-
-            if 'celsius' in sensor['UNITS'].lower():
+            raw_state = sensor['STATE']
+            sensor_state = _STATE_MAP.get(_lower(raw_state.strip()))
+            if sensor_state is None:
+                logging.warning(f"Unable to identify Inlet temperature sensor state is '{raw_state}'")
+                sensor_state = raw_state
+
+            raw_units = sensor['UNITS']
+            if 'celsius' in _lower(raw_units):
                 sensor_units = 'Celsius'
             else:
-                logging.warning(f"Unable to identify temperature unit '{sensor['UNITS']}")
-                sensor_units = sensor['UNITS']
-
-            sensor_temperature = {
-                'location': sensor['SENSOR'],
-                'reading': sensor_reading,
-                'units': sensor_units,
-                'state': sensor_state,
-                'name': 'Temp'
-            }
-
-        sensor_data.append(sensor_temperature)
+                logging.warning(f"Unable to identify temperature unit '{raw_units}")
+                sensor_units = raw_units
+
+            sensor_temperature = _ParsedSensor(
+                location = sensor_location,
+                reading = sensor_reading,
+                units = sensor_units,
+                state = sensor_state,
+                name = 'Temp'
+            )
+            sensor_data.append(sensor_temperature)
 
         return sensor_data
\ No newline at end of file
@@ -16,9 +16,66 @@
 
 import logging
 import re
+from dataclasses import dataclass
 from .model import PoweffModel, Asset, Interface, Sensor
 from .normaliser import Normaliser
 
+_RE_DIGITS = re.compile(r"\d+")
+_RE_SPEED_UNIT = re.compile(r"(\d+)\s?(\S)b")
+_RE_PHYS_IF = re.compile(r'ethernet\s?[\d\/]+|gige\s?[\d\/]+|mgmteth')
+
+@dataclass(slots=True)
+class _ParsedAsset:
+    """
+    Asset parsed from show inventory, before it is built into the POWEFF model
+    """
+    entity: str
+    description: str
+    pid: str
+    serial: str
+    vid: str
+    slot: str
+
+@dataclass(slots=True)
+class _ParsedInterface:
+    """
+    Interface parsed from show interfaces, before it is built into the POWEFF model
+    """
+    name: str
+    if_index: str
+    interface_type: str
+    bandwidth: int
+    speed: object
+    data_rate_frequency: int
+    input_packet_rate: int
+    input_data_rate: int
+    output_packet_rate: int
+    output_data_rate: int
+
+@dataclass(slots=True)
+class _ParsedSensor:
+    """
+    Sensor parsed from device command outputs, before it is built into the POWEFF model
+    """
+    location: str
+    name: str
+    state: str
+    reading: float
+    units: str
+
+def _na(value):
+    """
+    Strips an inventory value, normalising empty values to 'NA'
+    A reported 'N/A' is kept as is, since stored asset uids are built from it
+    """
+    return value.strip() or 'NA'
+
+# Multipliers from the speed unit prefix to Kbps
+_SPEED_MULT = {'k': 1, 'm': 1000, 'g': 1000000}
+
+# Divisor from bits/s data rates to kbps
+_BPS_TO_KBPS_DIV = 1000
+
 class Iosxe_Cli_Normaliser(Normaliser):
 
     def __init__(self, customer):
@@ -42,6 +99,14 @@ class Iosxe_Cli_Normaliser(Normaliser):
 
         hostname = device
 
+        # Raw outputs of the commands from get_commands()
+        inventory_output = command_data.get('show-inventory', '')
+        interfaces_output = command_data.get('show-interfaces', '')
+        ifindex_output = command_data.get('show-ifindex', '')
+        environment_output = command_data.get('show-environment', '')
+        cpu_output = command_data.get('show-processes-cpu', '')
+        memory_output = command_data.get('show-memory', '')
+
         sitename = device_config['site']
 
         try:
@@ -54,7 +119,7 @@ class Iosxe_Cli_Normaliser(Normaliser):
 
         try:
             logging.info(f"{device} Extracting assets")
-            asset_data = self._parse_assets(command_data)
+            asset_data = self._parse_assets(inventory_output)
             if len(asset_data) == 0:
                 raise Exception("Parsing assets returned empty list")
             logging.debug(asset_data)
@@ -64,7 +129,7 @@ class Iosxe_Cli_Normaliser(Normaliser):
         
         try:
             logging.info(f"{device} Extracting interfaces")
-            interface_data = self._parse_interfaces(command_data)
+            interface_data = self._parse_interfaces(interfaces_output, ifindex_output)
             if len(interface_data) == 0:
                 raise Exception("Parsing interfaces returned empty list")
             logging.debug(interface_data)
@@ -74,7 +139,7 @@ class Iosxe_Cli_Normaliser(Normaliser):
         
         try:
             logging.info(f"{device} Extracting sensors")
-            sensor_data = self._parse_sensors(command_data)
+            sensor_data = self._parse_sensors(environment_output, cpu_output, memory_output)
             if len(sensor_data) == 0:
                 # do not raise exception because main chassis assets and interfaces might be used later on
                 logging.warning("Sensor data returned empty list. POWEFF data will still be processed.")
@@ -84,47 +149,44 @@ class Iosxe_Cli_Normaliser(Normaliser):
             return None
 
         logging.info(f"{device} Building POWEFF Model")
-        for i in asset_data:
-            asset = Asset(
-                pid = i['pid'],
+        current_device.add_assets(
+            Asset(
+                pid = i.pid,
                 hostname = hostname,
-                entity = i['entity'],
-                description = i['description'],
-                serial = i['serial'],
-                vid = i['vid'],
-                slot = i['slot'],
+                entity = i.entity,
+                description = i.description,
+                serial = i.serial,
+                vid = i.vid,
+                slot = i.slot,
                 lat = location['Latitude'],
                 long = location['Longitude'],
                 site = sitename,
                 customer = self._customer
-            )
-            current_device.add_asset(asset)
-
-        for i in interface_data:
-            interface = Interface(
-                ifname = i['name'],
-                index = i.get('if-index', ''),
-                bandwidth = i['bandwidth'],
-                type=i['interface-type'],
-                speed = i['speed'],
-                data_rate_frequency = i['data_rate_frequency'],
-                input_packet_rate = i['input_packet_rate'],
-                input_data_rate = i['input_data_rate'],
-                output_packet_rate = i['output_packet_rate'],
-                output_data_rate = i['output_data_rate']
-            )
-            current_device.add_interface(interface)
-        
-        for i in sensor_data:
-            sensor = Sensor(
-                location = i['location'],
-                name = i['name'],
-                state = i['state'],
-                reading = i['reading'],
-                units = i['units']
-            )
-            current_device.add_sensor(sensor)
-        
+            ) for i in asset_data)
+
+        current_device.add_interfaces(
+            Interface(
+                ifname = i.name,
+                index = i.if_index,
+                bandwidth = i.bandwidth,
+                type = i.interface_type,
+                speed = i.speed,
+                data_rate_frequency = i.data_rate_frequency,
+                input_packet_rate = i.input_packet_rate,
+                input_data_rate = i.input_data_rate,
+                output_packet_rate = i.output_packet_rate,
+                output_data_rate = i.output_data_rate
+            ) for i in interface_data)
+
+        current_device.add_sensors(
+            Sensor(
+                location = i.location,
+                name = i.name,
+                state = i.state,
+                reading = i.reading,
+                units = i.units
+            ) for i in sensor_data)
+
         try:
             poweff_current = current_device.serialise()
         except Exception as e:
@@ -135,113 +197,113 @@ class Iosxe_Cli_Normaliser(Normaliser):
 
         return self._models
 
-    def _parse_assets(self, command_data):
+    def _parse_assets(self, inventory_output):
         try:
-            asset_data = self._parse_inventory_textfsm(command_data)
+            asset_data = self._parse_inventory_textfsm(inventory_output)
         except:
             asset_data = []
 
         return asset_data
 
-    def _parse_inventory_textfsm(self, command_data):
-        show_inventory = self._tokenize_fsm(command_data['show-inventory'], 'iosxe_show_inventory.fsm')
+    def _parse_inventory_textfsm(self, inventory_output):
+        show_inventory = self._tokenize_fsm(inventory_output, 'iosxe_show_inventory.fsm')
         logging.debug(show_inventory)
 
-        asset_data = []
-        
-        for inv in show_inventory:
-
-            params = {'entity': inv['NAME'].strip(),
-                      'description': inv['DESCR'].strip(),
-                      'pid': inv['PID'].strip(),
-                      'serial': inv['SN'].strip(),
-                      'vid': inv['VID'].strip(),
-                      'slot': 'None'}
-            
-            if params['serial'].lower() in ("N/A", ""):
-                params['serial'] = "NA"
-            if params['vid'].lower() in ("N/A", ""):
-                params['vid'] = "NA"
-
-            asset_data.append(params)
+        asset_data = [_ParsedAsset(entity = inv['NAME'].strip(),
+                                   description = inv['DESCR'].strip(),
+                                   pid = inv['PID'].strip(),
+                                   serial = _na(inv['SN']),
+                                   vid = _na(inv['VID']),
+                                   slot = 'None') for inv in show_inventory]
 
-        asset_data[0]['slot'] = 'Chassis'
+        if asset_data:
+            asset_data[0].slot = 'Chassis'
 
         return asset_data
 
-    def _parse_interfaces(self, command_data):
-        tokenized_snmp_interface = self._tokenize_fsm(command_data.get('show-ifindex', ""), 'iosxe_show_snmp_mib_ifmib_ifindex.fsm')
+    def _parse_interfaces(self, interfaces_output, ifindex_output):
+        tokenized_snmp_interface = self._tokenize_fsm(ifindex_output, 'iosxe_show_snmp_mib_ifmib_ifindex.fsm')
         logging.debug(tokenized_snmp_interface)
+        ifindex_map = {i['IFNAME']: i['IFINDEX'] for i in tokenized_snmp_interface}
 
-        interface_data = []
-        tokenized = self._tokenize_fsm(command_data.get('show-interfaces', ''), 'iosxe_show_interfaces.fsm')
+        tokenized = self._tokenize_fsm(interfaces_output, 'iosxe_show_interfaces.fsm')
         logging.debug(tokenized)
 
-        for interface_token in tokenized:
-            interface = {}
-            name = interface_token["INTERFACE"]
-            if not self._is_physical_interface(name):
-                logging.debug(f"Interface {name} is a virtual. Skipping.")
-                continue
-            if "up" not in interface_token["LINK_STATUS"]:
-                logging.debug(f"Interface {name} is down. Skipping")
-                continue
-            interface["name"] = name
-            interface["if-index"] = self._match_ifindex(name, tokenized_snmp_interface)
-            interface["interface-type"] = interface_token["HARDWARE_TYPE"]
-            
-            # units already in Kbit, eg "10000000 Kbit"
-            bandwidth_match = re.search(r"\d+", interface_token["BANDWIDTH"]) 
-            if bandwidth_match:
-                interface["bandwidth"] = int(bandwidth_match[0])
+        return [interface for interface_token in tokenized
+                if (interface := self._build_interface(interface_token, ifindex_map)) is not None]
+
+    def _build_interface(self, interface_token, ifindex_map):
+        """
+        Builds a parsed interface out of a single tokenized 'show interfaces' entry
+        Parameters:
+            interface_token: TextFSM row for one interface
+            ifindex_map: interface name to SNMP ifIndex mapping
+        Returns:
+            _ParsedInterface, None if the interface is virtual or down
+        """
+        name = interface_token["INTERFACE"]
+        if not self._is_physical_interface(name):
+            logging.debug(f"Interface {name} is a virtual. Skipping.")
+            return None
+        if "up" not in interface_token["LINK_STATUS"]:
+            logging.debug(f"Interface {name} is down. Skipping")
+            return None
+        
+        # units already in Kbit, eg "10000000 Kbit"
+        bandwidth_match = _RE_DIGITS.search(interface_token["BANDWIDTH"])
+        if bandwidth_match:
+            bandwidth = int(bandwidth_match[0])
+        else:
+            bandwidth = 0
+        # sample "10 Gb/s", "auto-speed", 
+        duplex_speed_raw = interface_token["SPEED"]
+        duplex_speed = duplex_speed_raw
+        speed_match = _RE_SPEED_UNIT.search(duplex_speed_raw)
+        if speed_match:
+            speed_mult = _SPEED_MULT.get(speed_match[2].lower())
+            if speed_mult:
+                duplex_speed = int(speed_match[1]) * speed_mult
             else:
-                interface["bandwidth"] = 0
-            # sample "10 Gb/s", "auto-speed", 
-            duplex_speed_raw = interface_token["SPEED"]
-            duplex_speed = duplex_speed_raw
-            if re.search(r"\d+\s?\Sb", duplex_speed_raw):
-                duplex_speed = int(re.search(r"\d+", duplex_speed_raw)[0])
-                if "kb" in duplex_speed_raw.lower():
-                    pass
-                elif "mb" in duplex_speed_raw.lower():
-                    duplex_speed *= 1000
-                elif "gb" in duplex_speed_raw.lower():
-                    duplex_speed *= 1000000
-                else:
-                    logging.warn(f"Could not identify Duplex speed units in '{duplex_speed_raw}'. Placing raw extract instead")
-                    duplex_speed = duplex_speed_raw
-            interface["speed"] = duplex_speed
-            
-            try:
-                bps_to_kbps = 0.001
-                interface["input_packet_rate"] = int(interface_token["INPUT_RATE_PPS"]) # Units in packets/s
-                interface["input_data_rate"] = int(int(interface_token["INPUT_RATE_BPS"]) * bps_to_kbps) # Units in kpbs
-                interface["output_packet_rate"] = int(interface_token["OUTPUT_RATE_PPS"]) # Units in packets/s
-                interface["output_data_rate"] = int(int(interface_token["OUTPUT_RATE_BPS"]) * bps_to_kbps) # Units in kpbs
-
-                # sample "30 seconds", "1 minute"
-                load_interval_raw = interface_token["LOAD_INTERVAL_INPUT"]
-                load_interval_val = int(re.search(r"\d+", load_interval_raw)[0])
-                if "minute" in load_interval_raw:
-                    load_interval_val *= 60
-                interface["data_rate_frequency"] = load_interval_val
-            except: #some interfaces such as loopbacks will not have have these data rates
-                interface["data_rate_frequency"] = 0
-                interface["input_packet_rate"] = 0
-                interface["input_data_rate"] = 0
-                interface["output_packet_rate"] = 0
-                interface["output_data_rate"] = 0
-
-            interface_data.append(interface)
-
-        return interface_data
-
-    def _parse_sensors(self, command_data):
+                logging.warn(f"Could not identify Duplex speed units in '{duplex_speed_raw}'. Placing raw extract instead")
+        
+        try:
+            input_packet_rate = int(interface_token["INPUT_RATE_PPS"]) # Units in packets/s
+            input_data_rate = int(interface_token["INPUT_RATE_BPS"]) // _BPS_TO_KBPS_DIV # Units in kpbs
+            output_packet_rate = int(interface_token["OUTPUT_RATE_PPS"]) # Units in packets/s
+            output_data_rate = int(interface_token["OUTPUT_RATE_BPS"]) // _BPS_TO_KBPS_DIV # Units in kpbs
+
+            # sample "30 seconds", "1 minute"
+            load_interval_raw = interface_token["LOAD_INTERVAL_INPUT"]
+            load_interval_val = int(_RE_DIGITS.search(load_interval_raw)[0])
+            if "minute" in load_interval_raw:
+                load_interval_val *= 60
+            data_rate_frequency = load_interval_val
+        except: #some interfaces such as loopbacks will not have have these data rates
+            data_rate_frequency = 0
+            input_packet_rate = 0
+            input_data_rate = 0
+            output_packet_rate = 0
+            output_data_rate = 0
+
+        return _ParsedInterface(
+            name = name,
+            if_index = ifindex_map.get(name, ""),
+            interface_type = interface_token["HARDWARE_TYPE"],
+            bandwidth = bandwidth,
+            speed = duplex_speed,
+            data_rate_frequency = data_rate_frequency,
+            input_packet_rate = input_packet_rate,
+            input_data_rate = input_data_rate,
+            output_packet_rate = output_packet_rate,
+            output_data_rate = output_data_rate
+        )
+
+    def _parse_sensors(self, environment_output, cpu_output, memory_output):
         pass
 
 
-    def _parse_cpu_textfsm(self, command_data):
-        tokenized = self._tokenize_fsm(command_data['show-processes-cpu'], 'iosxe_show_processes_cpu.fsm')
+    def _parse_cpu_textfsm(self, cpu_output):
+        tokenized = self._tokenize_fsm(cpu_output, 'iosxe_show_processes_cpu.fsm')
         logging.debug(tokenized)
 
         if len(tokenized) == 0:
@@ -258,17 +320,17 @@ class Iosxe_Cli_Normaliser(Normaliser):
             logging.error("Extracted CPU usages not numerical")
             return []
         
-        sensor_cpu_five_min = {
-            'location': 'Chassis',
-            'reading': cpu_5min,
-            'units': 'Percentage',
-            'state': 'NA',
-            'name': 'CPU-5Min'
-        }
+        sensor_cpu_five_min = _ParsedSensor(
+            location = 'Chassis',
+            reading = cpu_5min,
+            units = 'Percentage',
+            state = 'NA',
+            name = 'CPU-5Min'
+        )
         return [sensor_cpu_five_min]
 
-    def _parse_memory_textfsm(self, command_data):
-        tokenized = self._tokenize_fsm(command_data['show-memory'], 'iosxe_show_mem.fsm')
+    def _parse_memory_textfsm(self, memory_output):
+        tokenized = self._tokenize_fsm(memory_output, 'iosxe_show_mem.fsm')
         logging.debug(tokenized)
 
         if len(tokenized) == 0:
@@ -288,26 +350,20 @@ class Iosxe_Cli_Normaliser(Normaliser):
             logging.error("Extracted Memory usages do not add up correctly")
             return []
 
-        sensor_memory = {
-            'location': 'Chassis',
-            'reading': round(100*(mem_used/mem_total), 2),
-            'units': 'Percentage',
-            'state': 'NA',
-            'name': 'Memory'
-        }
+        sensor_memory = _ParsedSensor(
+            location = 'Chassis',
+            reading = round(100*(mem_used/mem_total), 2),
+            units = 'Percentage',
+            state = 'NA',
+            name = 'Memory'
+        )
         return [sensor_memory]
     
-    def _parse_temperature_textfsm(self, command_data):
+    def _parse_temperature_textfsm(self, show_environment):
         pass
 
-    def _match_ifindex(self, ifname, tokenized):
-        for i in tokenized:
-            if ifname == i['IFNAME']:
-                return i['IFINDEX']
-        return ""
-
     def _is_physical_interface(self, name):
         # TODO other cases, if any
-        if re.search(r'ethernet\s?[\d\/]+|gige\s?[\d\/]+|mgmteth', name.lower()):
+        if _RE_PHYS_IF.search(name.lower()):
             return True
         return False
\ No newline at end of file
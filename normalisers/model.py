@@ -14,23 +14,43 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
-import datetime
-import json
-import calendar
+import orjson
+import sys
+import time
+
+# POWEFF keys, interned so every serialised model shares the same key objects
+_K_LMOS = sys.intern('ietf-lmo:lmos')
+_K_DEVICE_FAMILY = sys.intern('ietf-susi-asset-ext:device_family')
+_K_NAME = sys.intern('ietf-lmo-assets-inventory:name')
+_K_PID = sys.intern('ietf-lmo-assets-inventory:pid')
+_K_DESCRIPTION = sys.intern('ietf-lmo-assets-inventory:description')
+_K_SERIAL = sys.intern('ietf-lmo-assets-inventory:serial-number')
+_K_ENTITY = sys.intern('ietf-lmo-assets-inventory:entity-name')
+_K_VID = sys.intern('ietf-lmo-assets-inventory:vid')
+_K_STATUS = sys.intern('ietf-susi-asset-ext:status')
+_K_SLOT = sys.intern('ietf-susi-asset-ext:slot')
+_K_SITE = sys.intern('ietf-susi-asset-ext:site')
+_K_UID = sys.intern('ietf-lmo-assets-inventory:uid')
+_K_LOCATION = sys.intern('ietf-lmo-assets-inventory:install-location')
+_K_INTERFACES = sys.intern('ietf-susi-power-traffic:interfaces')
+_K_SENSORS = sys.intern('ietf-susi-power-environment:sensors')
 
 class PoweffModel:
     """
     Represents POWEFF Specification LMO Type
     """
 
+    __slots__ = ('_family', '_assets', '_timestamp', '_serialised')
+
     def __init__(self):
         self._family = ''
         self._assets = []
-        date = datetime.datetime.utcnow()
-        self._timestamp = str(calendar.timegm(date.utctimetuple()))
+        self._timestamp = str(int(time.time()))
+        # serialise() output, rebuilt only after the model is modified through its methods
+        self._serialised = None
 
     def __str__(self):
-        return(json.dumps(self.serialise()))
+        return(orjson.dumps(self.serialise()).decode())
 
     def set_family(self, family):
         """
@@ -39,6 +59,7 @@ class PoweffModel:
             family: device family i.e. ASR1k, ASR9k etc
         """
         self._family = family
+        self._serialised = None
 
     def add_asset(self, asset):
         """
@@ -47,6 +68,16 @@ class PoweffModel:
             asset: POWEFF Asset object to be be added
         """
         self._assets.append(asset)
+        self._serialised = None
+
+    def add_assets(self, assets):
+        """
+        Adds assets in bulk to the toplevel LMO object
+        Parameters:
+            assets: iterable of POWEFF Asset objects to be added
+        """
+        self._assets.extend(assets)
+        self._serialised = None
 
     def add_interface(self, interface):
         """
@@ -55,6 +86,16 @@ class PoweffModel:
             interface: POWEFF Interface object to be added
         """
         self._assets[0].add_interface(interface)
+        self._serialised = None
+
+    def add_interfaces(self, interfaces):
+        """
+        Utility method, adds interfaces in bulk to the first asset in the list
+        Parameters:
+            interfaces: iterable of POWEFF Interface objects to be added
+        """
+        self._assets[0].add_interfaces(interfaces)
+        self._serialised = None
 
     def add_sensor(self, sensor):
         """
@@ -63,38 +104,48 @@ class PoweffModel:
             sensor: POWEFF Sensor object to be added
         """
         self._assets[0].add_sensor(sensor)
+        self._serialised = None
+
+    def add_sensors(self, sensors):
+        """
+        Utility method, adds sensors in bulk to the first asset in the list
+        Parameters:
+            sensors: iterable of POWEFF Sensor objects to be added
+        """
+        self._assets[0].add_sensors(sensors)
+        self._serialised = None
 
     def serialise(self):
         """
         Produces JSON representation of the POWEFF model
         recursively calling serialise on the constituent assets
         Returns:
-            poweff model in json format
+            poweff model in json format, shared across calls until the model is modified
         """
+        if self._serialised is not None:
+            return self._serialised
+
         assets = []
         for asset in self._assets:
             assets.append(asset.serialise())
 
         poweff = {
             'data': {
-                'ietf-lmo:lmos': {
+                _K_LMOS: {
                     'lmo': {
                         'lmo-class': 'ietf-lmo-asset:asset',
                         'timestamp': self._timestamp,
-                        'ietf-susi-asset-ext:device_family': self._family,
+                        _K_DEVICE_FAMILY: self._family,
                         'inst': assets
                     }
                 }
             }
         }
-        try:
-            _ = poweff['data']['ietf-lmo:lmos']['lmo']['inst'][0]['ietf-susi-power-traffic:interfaces']
-        except:
+        if not assets or _K_INTERFACES not in assets[0]:
             raise Exception("No Interfaces Found")
-        try:
-            _ = poweff['data']['ietf-lmo:lmos']['lmo']['inst'][0]['ietf-susi-power-environment:sensors']
-        except:
+        if _K_SENSORS not in assets[0]:
             raise Exception("No Sensors Found")
+        self._serialised = poweff
         return poweff
 
 class Asset:
@@ -102,6 +153,9 @@ class Asset:
     Represents POWEFF Specification Asset Type
     """
 
+    __slots__ = ('_interfaces', '_sensors', '_pid', '_vid', '_hostname', '_entity', '_description',
+                 '_serial', '_status', '_slot', '_lat', '_long', '_site', '_customer')
+
     def __init__(self, **kwargs):
 
         # set defaults to avoid serialisation errors
@@ -121,7 +175,7 @@ class Asset:
         self._customer = kwargs.get('customer', '')
 
     def __str__(self):
-        return(json.dumps(self.serialise()))
+        return(orjson.dumps(self.serialise()).decode())
 
     def add_interface(self, interface):
         """
@@ -129,12 +183,24 @@ class Asset:
         """
         self._interfaces.append(interface)
 
+    def add_interfaces(self, interfaces):
+        """
+        Adds interfaces in bulk to this asset
+        """
+        self._interfaces.extend(interfaces)
+
     def add_sensor(self, sensor):
         """
         Adds a sensor to this asset
         """
         self._sensors.append(sensor)
 
+    def add_sensors(self, sensors):
+        """
+        Adds sensors in bulk to this asset
+        """
+        self._sensors.extend(sensors)
+
     def serialise(self):
         """
         Produces JSON representation of the POWEFF asset
@@ -148,17 +214,17 @@ class Asset:
                 'lmo-class': 'ietf-lmo-assets-inventory:asset',
                 'id': self._hostname
             },
-            'ietf-lmo-assets-inventory:name': self._hostname,
-            'ietf-lmo-assets-inventory:pid': self._pid,
-            'ietf-lmo-assets-inventory:description': self._description,
-            'ietf-lmo-assets-inventory:serial-number': self._serial,
-            'ietf-lmo-assets-inventory:entity-name': self._entity,
-            'ietf-lmo-assets-inventory:vid': self._vid,
-            'ietf-susi-asset-ext:status': self._status,
-            'ietf-susi-asset-ext:slot': self._slot,
-            'ietf-susi-asset-ext:site': self._site,
-            'ietf-lmo-assets-inventory:uid': self._customer + self._pid + self._serial,
-            'ietf-lmo-assets-inventory:install-location': {
+            _K_NAME: self._hostname,
+            _K_PID: self._pid,
+            _K_DESCRIPTION: self._description,
+            _K_SERIAL: self._serial,
+            _K_ENTITY: self._entity,
+            _K_VID: self._vid,
+            _K_STATUS: self._status,
+            _K_SLOT: self._slot,
+            _K_SITE: self._site,
+            _K_UID: self._customer + self._pid + self._serial,
+            _K_LOCATION: {
                 'geolocation': {
                     'latitude': self._lat,
                     'longitude': self._long
@@ -170,14 +236,14 @@ class Asset:
         for interface in self._interfaces:
             interfaces.append(interface.serialise())
         if len(interfaces) > 0:
-            poweff.setdefault('ietf-susi-power-traffic:interfaces',{})
-            poweff['ietf-susi-power-traffic:interfaces']['interface'] = interfaces
+            poweff.setdefault(_K_INTERFACES,{})
+            poweff[_K_INTERFACES]['interface'] = interfaces
         sensors = []
         for sensor in self._sensors:
             sensors.append(sensor.serialise())
         if len(sensors) > 0:
-            poweff.setdefault('ietf-susi-power-environment:sensors',{})
-            poweff['ietf-susi-power-environment:sensors']['sensors'] = sensors
+            poweff.setdefault(_K_SENSORS,{})
+            poweff[_K_SENSORS]['sensors'] = sensors
 
         return poweff
 
@@ -186,6 +252,9 @@ class Interface:
     Represents POWEFF Specification Interface Type
     """
 
+    __slots__ = ('_name', '_index', '_id', '_type', '_bandwidth', '_speed', '_input_packet_rate',
+                 '_input_data_rate', '_output_packet_rate', '_output_data_rate', '_data_rate_frequency')
+
     def __init__(self, **kwargs):
 
         # set defaults to avoid serialisation errors
@@ -202,7 +271,7 @@ class Interface:
         self._data_rate_frequency = kwargs.get('data_rate_frequency', 0)
     
     def __str__(self):
-        return(json.dumps(self.serialise()))
+        return(orjson.dumps(self.serialise()).decode())
 
     def serialise(self):
         """
@@ -231,6 +300,8 @@ class Sensor:
     Represents POWEFF Specification Sensor Type
     """
 
+    __slots__ = ('_location', '_name', '_state', '_reading', '_units')
+
     def __init__(self, **kwargs):
 
         # update from args, else set defaults
@@ -241,7 +312,7 @@ class Sensor:
         self._units = kwargs.get('units', '')
 
     def __str__(self):
-        return(json.dumps(self.serialise()))
+        return(orjson.dumps(self.serialise()).decode())
 
     def serialise(self):
         """
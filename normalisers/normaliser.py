@@ -14,7 +14,51 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import functools
 import logging
+import os
+import re
+import sys
+import textfsm
+
+_NUM_RE = re.compile(r'^[-+]?(?:\d+(?:\.\d*)?|\.\d+)$')
+
+def _try_float(value):
+    """
+    Converts a tokenized reading to float without raising on non-numerical values
+    Parameters:
+        value: reading string extracted by TextFSM
+    Returns:
+        float value, None if the reading is not numerical
+    """
+    value = value.strip()
+    return float(value) if _NUM_RE.match(value) else None
+
+@functools.lru_cache(maxsize=1024)
+def _lower(value):
+    """
+    Lowercases a tokenized field, sensor names, units and states come from a
+    small domain so the interned result is shared across rows and calls
+    Parameters:
+        value: field string extracted by TextFSM
+    Returns:
+        interned lowercase string
+    """
+    return sys.intern(value.lower())
+
+@functools.lru_cache(maxsize=None)
+def _load_template(filename):
+    """
+    Loads and compiles a TextFSM template, cached for the lifetime of the process
+    Parameters:
+        filename: template file name under textfsm_templates directory
+    Returns:
+        compiled TextFSM object, callers must Reset() it before parsing
+    """
+    fsm_file = os.path.join(os.path.dirname(__file__), 'textfsm_templates', filename)
+    logging.debug(f"Textfsm file in {fsm_file}")
+    with open(fsm_file) as template:
+        return textfsm.TextFSM(template)
 
 class Normaliser:
     '''
@@ -30,13 +74,9 @@ class Normaliser:
         pass
 
     def _tokenize_fsm(self, data, filename):
-        import os
-        import textfsm
-
-        fsm_file = os.path.join(os.path.dirname(__file__), 'textfsm_templates', filename)
-        logging.debug(f"Textfsm file in {fsm_file}")
-        with open(fsm_file) as template:
-            fsm = textfsm.TextFSM(template)
+        fsm = _load_template(filename)
+        # Compiled template is shared, clear state left over from the previous parse
+        fsm.Reset()
         try:
             result = fsm.ParseText(data)
             logging.debug(result)
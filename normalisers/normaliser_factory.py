@@ -17,6 +17,15 @@
 from .asr1k_cli_normaliser import Asr1k_Cli_Normaliser
 from .cat9300_cli_normaliser import Cat9300_Cli_Normaliser
 
+# Connection protocols served by the CLI normalisers
+_CLI_CONNECTIONS = frozenset(('ssh', 'cspc', 'radkit'))
+
+# Device family to CLI Normaliser class
+_NORMALISER_REGISTRY = {
+    'ASR1k': Asr1k_Cli_Normaliser,
+    'Cat9300': Cat9300_Cli_Normaliser
+}
+
 def get_normaliser(task_config):
 
     """
@@ -24,21 +33,16 @@ def get_normaliser(task_config):
     Parameters:
         task_config: collection task config dict including os_type and connection
     Returns:
-        Instance of suitable Normaliser class
+        Instance of suitable Normaliser class, None if the combination is not supported
     """
 
     conn_type = task_config['device'].get('connection')
     family = task_config['device'].get('family')
     customer = task_config['customer']['name']
-    
-    if (conn_type in ('ssh', 'cspc', 'radkit')):
-        if family == 'ASR1k' :
-            return Asr1k_Cli_Normaliser(customer)
-        elif family == 'Cat9300':
-            return Cat9300_Cli_Normaliser(customer)
-        else:
-            None
-    else:
-        # Should never reach this line
-        # Supported combinations must be validated in Inventory Yaml
-        None
+
+    # Supported combinations must be validated in Inventory Yaml
+    if conn_type not in _CLI_CONNECTIONS:
+        return None
+
+    normaliser = _NORMALISER_REGISTRY.get(family)
+    return normaliser(customer) if normaliser else None
@@ -14,15 +14,23 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
-import json
 import os
 import requests
-import time
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from utils.applog import logger
 
-# Caches CO2 data for a location
-# dict of (lat, long) and (timestamp, co2intensity)
-co2_intensity_cache = {}
+# Caches CO2 data for a location for 1hr, bounded for deployments with many sites
+# (lat, long) rounded to a ~1km grid to co2intensity, so devices of a site share an entry
+co2_intensity_cache = TTLCache(maxsize=4096, ttl=3600)
+
+# Shared session, keeps the TLS connection to EnergyMap alive across calls
+session = requests.Session()
+session.mount('https://', HTTPAdapter(
+    pool_connections = 32,
+    pool_maxsize = 64,
+    max_retries = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504])))
 
 def get_co2_intensity(device, lat,long):
   
@@ -35,15 +43,26 @@ def get_co2_intensity(device, lat,long):
     return None
 
   # fetch co2intensity for the given (lat, long), if already exists
-  # if the cached value is less than 1hr old, reuse
-  record = co2_intensity_cache.get((lat, long))
-  if record and time.time() - record[0] < 360:
-     logger.debug(f"{device} returning from cache")
-     return record[1]
-  
-  # Else, fetch the co2intensity again
+  # expired entries are evicted by the cache itself
   try:
-    response = requests.get(
+    location = (round(float(lat), 2), round(float(long), 2))
+  except (TypeError, ValueError) as e:
+    logger.error(f"{device} Invalid geolocation ({lat}, {long}) {e}")
+    return None
+  co2_intensity = co2_intensity_cache.get(location)
+  if co2_intensity is not None:
+    logger.debug(f"{device} returning from cache")
+    return co2_intensity
+
+  # Else, fetch from EnergyMap and cache only successful lookups
+  co2_intensity = _fetch_co2_intensity(device, energymap, api_key, lat, long)
+  if co2_intensity is not None:
+    co2_intensity_cache[location] = co2_intensity
+  return co2_intensity
+
+def _fetch_co2_intensity(device, energymap, api_key, lat, long):
+  try:
+    response = session.get(
         url = f'{energymap}/v3/carbon-intensity/latest?lat={lat}&lon={long}&emissionFactorType=direct',
         headers = { "auth-token": api_key },
         verify = True,
@@ -52,14 +71,10 @@ def get_co2_intensity(device, lat,long):
         logger.error(f"{device} Failed to fetch co2 emission data {response.text}")
         return None
     else:
-        payload = json.loads(response.text)
+        payload = response.json()
         logger.debug(f"{device} payload")
-        co2_intensity = payload['carbonIntensity']
-        # update cache
-        co2_intensity_cache[(lat, long)] = (time.time(), co2_intensity)
-        return co2_intensity
+        return payload['carbonIntensity']
        
   except Exception as e:
     logger.error(f"{device} Failed to fetch report data {e}")
     return None
-
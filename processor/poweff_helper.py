@@ -14,11 +14,69 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import functools
 import re
-from datetime import datetime
+import time
+from collections import defaultdict
 from utils import dbcon
 from utils.applog import logger
 
+# Caches PSU available power looked up in the DB, PSU specs are static reference data
+# dict of pid and (expiry, available_power), PIDs not in the DB are cached with 0
+psu_specs_cache = {}
+PSU_SPECS_TTL = 24 * 3600
+# Misses expire sooner, so newly added specs are picked up without waiting a day
+PSU_SPECS_MISS_TTL = 3600
+
+# PSU sensors, reported per PSU location
+_PSU_SENSORS = frozenset(('Pin', 'Pout', 'Vin', 'Vout', 'Iin', 'Iout'))
+# System vital sensors and their vitals key
+_VITAL_SENSORS = {'CPU-5Min': 'cpu_usage', 'Memory': 'memory_usage'}
+# Temperature levels
+_TEMPERATURE_LEVELS = {"Unknown": -1, "Normal": 0, "Warning": 1, "Critical": 2}
+
+# Loopback, virtual interfaces etc
+_RE_SKIP_IF = re.compile(r'\.\d+$|^(?:Loopback|Port-channel|Vlan|mgmt|Po|Tunnel|Bundle)', re.IGNORECASE)
+
+@functools.lru_cache(maxsize=1024)
+def _extract_watts(pid):
+    """
+    Extracts the PSU power rating embedded in a PID, without regex
+    Parameters:
+        pid: string, product ID e.g. NXA-PAC-650W-PE or N7K-AC-7.5KW-INT
+    Returns:
+        power rating in watts, 0 if the PID carries no rating
+    """
+    # Units in KW e.g. N77-AC-3KW and  N7K-AC-7.5KW-INT
+    end = pid.find('KW')
+    while end != -1:
+        start = end
+        while start > 0 and pid[start - 1].isdecimal():
+            start -= 1
+        # Optional fraction, digits must lead the decimal point
+        if start > 0 and pid[start - 1] == '.':
+            whole = start - 1
+            while whole > 0 and pid[whole - 1].isdecimal():
+                whole -= 1
+            if whole < start - 1:
+                start = whole
+        if start < end:
+            return int(float(pid[start:end]) * 1000)
+        end = pid.find('KW', end + 2)
+
+    # Units in W e.g. NXA-PAC-650W-PE, N2200-PAC-400W
+    end = pid.find('W')
+    while end != -1:
+        start = end
+        while start > 0 and pid[start - 1].isdecimal():
+            start -= 1
+        if start < end:
+            return int(pid[start:end])
+        end = pid.find('W', end + 1)
+
+    # No match, may not be PSU PID
+    return 0
+
 def process_assets(customer, device, poweff):
     """
     Process assets from Poweff and insert into database
@@ -37,17 +95,12 @@ def process_assets(customer, device, poweff):
             ]
         on error: empty []
     """
-    assets = []
-    for i in poweff['inst']:
-        serial = i["ietf-lmo-assets-inventory:serial-number"].strip()
-        pid = i["ietf-lmo-assets-inventory:pid"].strip()
-
-        if pid:
-            assets.append(dict([
-                ('hostname', device),
-                ('serial', serial),
-                ('pid', pid)
-            ]))
+    # Assets without a PID are skipped
+    assets = [{
+                'hostname': device,
+                'serial': i["ietf-lmo-assets-inventory:serial-number"].strip(),
+                'pid': pid
+              } for i in poweff['inst'] if (pid := i["ietf-lmo-assets-inventory:pid"].strip())]
 
     if assets:
         dbcon.insert_assets(customer, device, assets)
@@ -55,13 +108,14 @@ def process_assets(customer, device, poweff):
     return assets
 
 
-def process_interfaces(customer, device, poweff):
+def process_interfaces(customer, device, poweff, timestamp):
     """
-    Process interfaces from Poweff and insert into database
+    Process interfaces from Poweff into interface metrics, inserted to database by the caller
     Parameters:
         customer: customer name
         device: device hostname
         poweff: Referene to "lmo" object in POWEFF payload
+        timestamp: POWEFF payload timestamp as timezone aware datetime
     Returns:
         on success: array of assets in the form
             [
@@ -82,37 +136,39 @@ def process_interfaces(customer, device, poweff):
     for i in poweff['inst'][0]['ietf-susi-power-traffic:interfaces']['interface']:
         # TODO: Below two filters probably moved to Tooling
         # Skip loopback, virtual interfaces etc
-        if re.search(r'\.\d+$|^Loopback|^Port-channel|^Vlan|^mgmt|^Po|^Tunnel|^Bundle', i['name'], re.IGNORECASE):
+        name = i['name']
+        if _RE_SKIP_IF.search(name):
             continue
         # Some old interfaces are reported with 0 bandwith
-        if i['bandwidth'] == 0:
+        bandwidth = i['bandwidth']
+        if bandwidth == 0:
             continue
 
-        metrics.append(dict([
-            ('timestamp', datetime.fromtimestamp(int(poweff['timestamp']))),
-            ('hostname', device),
-            ('ifname', i['name']),
-            ('bandwidth', i['bandwidth']),
-            ('traffic_in', i['statistics']['input-data-rate']),
-            ('traffic_out', i['statistics']['output-data-rate']),
-            ('utilization', (i['statistics']['input-data-rate'] +
-             i['statistics']['output-data-rate']) * 100 / i['bandwidth'])
-        ]))
+        stats = i['statistics']
+        traffic_in = stats['input-data-rate']
+        traffic_out = stats['output-data-rate']
+        metrics.append({
+            'timestamp': timestamp,
+            'hostname': device,
+            'ifname': name,
+            'bandwidth': bandwidth,
+            'traffic_in': traffic_in,
+            'traffic_out': traffic_out,
+            'utilization': (traffic_in + traffic_out) * 100 / bandwidth
+        })
 
     logger.debug(metrics)
-    if metrics:
-        dbcon.insert_ifmetrics(customer, device, metrics)
-
     return metrics
 
 
-def process_sensors(customer, device, poweff):
+def process_sensors(customer, device, poweff, timestamp):
     """
-    Process sensors from Poweff and insert into database
+    Process sensors from Poweff into psu metrics, inserted to database by the caller
     Parameters:
         customer: customer name
         device: device hostname
         poweff: Referene to "lmo" object in POWEFF payload
+        timestamp: POWEFF payload timestamp as timezone aware datetime
     Returns:
         on success: array of psu and system vital metrics
         PSU metrics as,
@@ -133,81 +189,82 @@ def process_sensors(customer, device, poweff):
             }
     """
 
-    # Define temperature levels
-    temperatures = {"Unknown": -1, "Normal": 0, "Warning": 1, "Critical": 2}
     # Initialise sensors to defaults
     vitals = {'cpu_usage': -1, 'memory_usage': -1, 'temperature': -1}
-    psus = {}
+    psus = defaultdict(dict)
 
     # Capture values of CPU, Memory and Power sensors
-    vitals['temperature'] = -1
+    max_temperature = -1
     for i in poweff['inst'][0]['ietf-susi-power-environment:sensors']['sensors']:
-        if i['sensor-name'] in ['Pin', 'Pout', 'Vin', 'Vout', 'Iin', 'Iout']:
-            psus[i['sensor-location']] = psus.get(i['sensor-location'], {})
-            psus[i['sensor-location']][i['sensor-name']
-                                       ] = i['sensor-current-reading']
-        elif i['sensor-name'] == 'CPU-5Min':
-            vitals['cpu_usage'] = i['sensor-current-reading']
-        elif i['sensor-name'] == 'Memory':
-            vitals['memory_usage'] = i['sensor-current-reading']
+        name = i['sensor-name']
+        if name in _PSU_SENSORS:
+            psus[i['sensor-location']][name] = i['sensor-current-reading']
+        elif name in _VITAL_SENSORS:
+            vitals[_VITAL_SENSORS[name]] = i['sensor-current-reading']
         # Among the many temperature sensors, capture the highest one
         elif i['sensor-units'] == 'Celsius':
-            level = temperatures.get(i['sensor-state'], -1)
-            if vitals['temperature'] < level:
-                vitals['temperature'] = level
+            level = _TEMPERATURE_LEVELS.get(i['sensor-state'], -1)
+            if max_temperature < level:
+                max_temperature = level
         else:
             # Ignore all other sensors for now
             pass
+    vitals['temperature'] = max_temperature
 
     # initialise psu metrics
     metrics = []
     for k, v in psus.items():
-        d = dict([
-                ('timestamp', datetime.fromtimestamp(
-                    int(poweff['timestamp']))),
-                ('hostname', device),
-                ('psuname', k)
-        ])
-
-        # Devices like ASR1k report only Voltage and Current
-        # Calculate Power as,
-        # P = Vrms * Irms (for AC) or V * I (for DC)
-        # This device specific behaviour to be moved to Collector?
-        if 'Vin' in v and 'Iin' in v:
-            v['Pin'] = v['Vin'] * v['Iin']
-        if 'Vout' in v and 'Iout' in v:
-            v['Pout'] = v['Vout'] * v['Iout']
-        logger.debug(v)
-
-        # If both Pin and Pout are available, then all good
-        # Else assume 88% efficiency and then calculate the other
-        # TODO: read efficiency from PSU specs
-        if 'Pin' in v and 'Pout' in v:
-            d['power_in'] = v['Pin']
-            d['power_out'] = v['Pout']
-            d['power_efficiency'] = 0 if (
-                v['Pin'] == 0) else int(v['Pout'] * 100/v['Pin'])
-        elif 'Pin' in v:
-            d['power_in'] = v['Pin']
-            d['power_out'] = 0.88 * v['Pin']
-            d['power_efficiency'] = 88
-        elif 'Pout' in v:
-            d['power_out'] = v['Pout']
-            d['power_in'] = v['Pout'] / 0.88
-            d['power_efficiency'] = 88
-        else:
+        power = _psu_power(v)
+        if power is None:
             logger.warning('No power measurements found')
             continue
-        metrics.append(d)
+        metrics.append({
+            'timestamp': timestamp,
+            'hostname': device,
+            'psuname': k,
+            'power_in': power[0],
+            'power_out': power[1],
+            'power_efficiency': power[2]
+        })
 
     logger.debug(metrics)
     logger.debug(vitals)
-    if metrics:
-        dbcon.insert_psumetrics(customer, device, metrics)
-
     return metrics, vitals
 
 
+def _psu_power(v):
+    """
+    Calculates power of a single PSU from its sensor readings
+    Parameters:
+        v: dict of PSU sensor name and reading, any of Pin, Pout, Vin, Vout, Iin, Iout
+    Returns:
+        on success: (power_in, power_out, power_efficiency)
+        on error: None if there are no power measurements
+    """
+    # Devices like ASR1k report only Voltage and Current
+    # Calculate Power as,
+    # P = Vrms * Irms (for AC) or V * I (for DC)
+    # This device specific behaviour to be moved to Collector?
+    if 'Vin' in v and 'Iin' in v:
+        v['Pin'] = v['Vin'] * v['Iin']
+    if 'Vout' in v and 'Iout' in v:
+        v['Pout'] = v['Vout'] * v['Iout']
+    logger.debug(v)
+
+    # If both Pin and Pout are available, then all good
+    # Else assume 88% efficiency and then calculate the other
+    # TODO: read efficiency from PSU specs
+    pin = v.get('Pin')
+    pout = v.get('Pout')
+    if pin is not None and pout is not None:
+        return pin, pout, 0 if pin == 0 else int(pout * 100/pin)
+    elif pin is not None:
+        return pin, 0.88 * pin, 88
+    elif pout is not None:
+        return pout / 0.88, pout, 88
+    return None
+
+
 def process_psus(device, assets):
     """
     Process reported assets on the device to find PSUs
@@ -258,14 +315,32 @@ def process_psus(device, assets):
             'N2200-PAC-400W', 'N2200-PAC-400W']
     '''
 
-    # Lookup power specification for these PIDs in the DB
-    psu_specs = dbcon.fetch_psu_specs(device, pids)
-    '''
-    Of the given PIDs, say only one is in the DB
-    [{'pid': 'NXA-PAC-650W-PE', 'nominal_power': 650, 'available_power': 598, 'efficiency': 92}]
-    '''
-    # Extract available_power from the DB result
-    psu_avl = {i['pid']: i['available_power'] for i in psu_specs}
+    # Reuse cached power specification, and lookup only the remaining PIDs in the DB
+    now = time.time()
+    psu_avl = {}
+    misses = []
+    for pid in set(pids):
+        record = psu_specs_cache.get(pid)
+        if record and now < record[0]:
+            psu_avl[pid] = record[1]
+        else:
+            misses.append(pid)
+
+    # Results are cached only when the lookup succeeded, so a DB error is not remembered as missing specs
+    psu_specs = dbcon.fetch_psu_specs(device, misses) if misses else None
+    if psu_specs is not None:
+        '''
+        Of the given PIDs, say only one is in the DB
+        {'NXA-PAC-650W-PE': {'nominal_power': 650, 'available_power': 598, 'efficiency': 92}}
+        '''
+        # Extract available_power from the DB result
+        for pid in misses:
+            spec = psu_specs.get(pid)
+            if spec:
+                psu_specs_cache[pid] = (now + PSU_SPECS_TTL, spec['available_power'])
+                psu_avl[pid] = spec['available_power']
+            else:
+                psu_specs_cache[pid] = (now + PSU_SPECS_MISS_TTL, 0)
     '''
     psu_avl = {'NXA-PAC-650W-PE': 598}
     '''
@@ -281,24 +356,12 @@ def process_psus(device, assets):
         # match with DB result
         power_avl = psu_avl.get(pid, 0)
 
-        # if not found i.e. 2nd case above, use regex to try extracting power rating from the PID itself
+        # if not found i.e. 2nd case above, try extracting power rating from the PID itself
         '''
         consider NXA-PAC-650W-PE, N2200-PAC-400W, N77-AC-3KW and  N7K-AC-7.5KW-INT
         '''
         if power_avl == 0:
-            match = re.search(r"(\d+\.*\d*)KW", pid)
-            if match:
-                # Units in KW e.g. N77-AC-3KW and  N7K-AC-7.5KW-INT
-                power_avl = int(float(match.group(1)) * 1000)
-            else:
-                match = re.search(r"(\d+)W", pid)
-                if match:
-                    # Units in W e.g. NXA-PAC-650W-PE, N2200-PAC-400W
-                    power_avl = int(match.group(1))
-                else:
-                    # No match, may not be PSU PID
-                    power_avl = 0
-            
+            power_avl = _extract_watts(pid)
             if power_avl != 0:
                 logger.warn(f"{device} PSU specs not found for {pid}, assumed Pout {power_avl}W")
    
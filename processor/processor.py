@@ -14,20 +14,122 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
-import json
+import orjson
 import os
+import signal
 import sys
-from datetime import datetime
+import threading
+from datetime import datetime, timezone
+from operator import itemgetter
 import energymap_proxy
 import poweff_helper as helper
-from utils import messaging, dbcon
+from utils import applog, messaging, dbcon
 from utils.applog import logconfig, logger
 
+# Set on SIGTERM, the event loop exits at the next batch boundary
+_stop = threading.Event()
+
+def _process_task(task_config):
+    """
+    Computes interface, PSU and power metrics of all POWEFF entries in a collection task
+    Parameters:
+        task_config: decoded collection task, including the POWEFF data
+    Returns:
+        (ifmetrics, psumetrics, powermetrics) lists of records to be written to DB
+        Raises an exception on malformed payload
+    """
+    customer = task_config['customer']['name']
+    device = task_config['device']['name']
+    ifmetrics = []
+    psumetrics = []
+    powermetrics = []
+
+    # Locate root level in each POWEFF entry and start processing
+    # Collector *always* pushes valid payload as per POWEFF schema
+    # So this json key traversal is safe enough
+    # But values are filled at runtime and need to validated
+    for poweff in task_config['poweff']:
+
+        root = poweff["data"]["ietf-lmo:lmos"]["lmo"]
+        chassis = root['inst'][0]
+        site = chassis["ietf-susi-asset-ext:site"]
+        device = chassis['ietf-lmo-assets-inventory:name']
+        family = root['ietf-susi-asset-ext:device_family']
+        timestamp = datetime.fromtimestamp(int(root['timestamp']), tz=timezone.utc)
+
+        # Process assets, interfaces and sensors from POWEFF
+        logger.info(f"{device} processing energy metrics")
+        assets = helper.process_assets(customer, device, root)
+        ifaces = helper.process_interfaces(customer, device, root, timestamp)
+        powers, vitals = helper.process_sensors(customer, device, root, timestamp)
+        ifmetrics.extend(ifaces)
+        psumetrics.extend(powers)
+
+        # Power metrics
+        power_in = sum(map(itemgetter('power_in'), powers))
+        power_out = sum(map(itemgetter('power_out'), powers))
+        power_efficiency = 0 if (power_in == 0) else int(power_out * 100/power_in)
+        power_available = helper.process_psus(device, assets)
+        power_utilization = 0 if (power_available == 0) else int(power_in * 100/power_available)
+
+        # Traffic data
+        traffic_in = sum(map(itemgetter('traffic_in'), ifaces))
+        traffic_out = sum(map(itemgetter('traffic_out'), ifaces))
+        # Traffic in and out are in Kbps, Total traffic in Gbps
+        total_traffic = (traffic_in + traffic_out)/1000000
+        traffic_efficiency = 0 if (total_traffic == 0) else int(power_in/total_traffic)
+
+        geolocation = chassis['ietf-lmo-assets-inventory:install-location']['geolocation']
+        lat = geolocation['latitude']
+        long = geolocation['longitude']
+        co2_intensity = energymap_proxy.get_co2_intensity(device, lat, long)
+        if not co2_intensity:
+            co2_intensity = 0
+            if 'avg_co2_intensity' in task_config['sites'][site]:
+                co2_intensity = int(task_config['sites'][site]['avg_co2_intensity'])
+                logger.info(f'{device} Using default CO2 intensity from config file instead')
+            else:
+                logger.warning(f'{device} No default CO2 intensity on site {site} of config file. CO2 intensity will be set to 0.')
+
+        # Record is built once all metrics are known
+        metrics = {
+            'timestamp': timestamp,
+            'site': site,
+            'hostname': device,
+            'family': family,
+            'power_in': power_in,
+            'power_out': power_out,
+            'power_efficiency': power_efficiency,
+            'power_available': power_available,
+            'power_utilization': power_utilization,
+            'traffic_in': traffic_in,
+            'traffic_out': traffic_out,
+            'traffic_efficiency': traffic_efficiency,
+            'temperature': vitals.get('temperature', -1),
+            'cpu_usage': vitals.get('cpu_usage', -1),
+            'memory_usage': vitals.get('memory_usage', -1),
+            'co2_intensity': co2_intensity
+        }
+
+        logger.debug(metrics)
+        powermetrics.append(metrics)
+
+    logger.info(f"{device} completed energy and sustainability calculations")
+
+    return ifmetrics, psumetrics, powermetrics
+
+def _on_sigterm(signum, frame):
+    """
+    SIGTERM handler (docker stop), ends the event loop once the current batch is written
+    """
+    _stop.set()
+
 def main():
 
     # Start with a baseline logger level
     logconfig(level='INFO')
     collections_topic = os.environ.get('COLLECTIONS_TOPIC', 'collections')
+    batch_size = int(os.environ.get('CONSUME_BATCH_SIZE', 100))
 
     # Connect to DB
     try:
@@ -38,96 +140,60 @@ def main():
 
     logger.info(f"Waiting for POWEFF metric payloads")
 
-    # Run event loop forever, waking up to receive POWEFF tasks through messaging
+    # Customer and loglevel the logger is currently configured with
+    current_logconfig = None
+
+    # Stop at the next batch boundary on SIGTERM, instead of dying with records half written
+    signal.signal(signal.SIGTERM, _on_sigterm)
+
+    # Run event loop until stopped, waking up to receive POWEFF tasks through messaging
     try:
-        while True:
-            payload = messaging.consume(collections_topic, 'processor')
-            task_config = json.loads(payload)
-            customer = task_config['customer']['name']
-            device = task_config['device']['name']
-            loglevel = task_config['loglevel']['console']
-
-            # Reconfigure logformat to include customer name and desired loglevel
-            logconfig(customer, loglevel)
-
-            # Locate root level in each POWEFF entry and start processing
-            # Collector *always* pushes valid payload as per POWEFF schema
-            # So this json key traversal is safe enough
-            # But values are filled at runtime and need to validated
-            for poweff in task_config['poweff']:
-
-                root = poweff["data"]["ietf-lmo:lmos"]["lmo"]
-                site = root['inst'][0]["ietf-susi-asset-ext:site"]
-                device = root['inst'][0]['ietf-lmo-assets-inventory:name']
-                family = root['ietf-susi-asset-ext:device_family']
-
-                # Process assets, interfaces and sensors from POWEFF
-                logger.info(f"{device} processing energy metrics")
-                assets = helper.process_assets(customer, device, root)
-                ifaces = helper.process_interfaces(customer, device, root)
-                powers, vitals = helper.process_sensors(customer, device, root)
-
-                # Initialise all metrics with default values
-                metrics = {
-                    'timestamp': datetime.fromtimestamp(int(root['timestamp'])),
-                    'site': site,
-                    'hostname': device,
-                    'family': family,
-                    'power_in': 0,
-                    'power_out': 0,
-                    'power_efficiency': 0,
-                    'power_available': 0,
-                    'power_utilization': 0,
-                    'traffic_in': 0,
-                    'traffic_out': 0,
-                    'traffic_efficiency': 0,
-                    'temperature': vitals.get('temperature', -1),
-                    'cpu_usage': vitals.get('cpu_usage', -1),
-                    'memory_usage': vitals.get('memory_usage', -1),
-                    'co2_intensity': 0
-                }
-
-                # Fill in power metrics
-                for i in powers:
-                    metrics['power_in'] += i['power_in']
-                    metrics['power_out'] += i['power_out']
-                metrics['power_efficiency'] = 0 if (metrics['power_in'] == 0) else int(
-                    metrics['power_out'] * 100/metrics['power_in'])
-                metrics['power_available'] = helper.process_psus(device, assets)
-
-                metrics['power_utilization'] = 0 if (metrics['power_available'] == 0) else int(
-                    metrics['power_in'] * 100/metrics['power_available'])
-
-                # Fill in traffic data
-                for i in ifaces:
-                    metrics['traffic_in'] += i['traffic_in']
-                    metrics['traffic_out'] += i['traffic_out']
-                # Traffic in and out are in Kbps, Total traffic in Gbps
-                total_traffic = (
-                    metrics['traffic_in'] + metrics['traffic_out'])/1000000
-                metrics['traffic_efficiency'] = 0 if (
-                    total_traffic == 0) else int(metrics['power_in']/total_traffic)
-                lat = root['inst'][0]['ietf-lmo-assets-inventory:install-location']['geolocation']['latitude']
-                long = root['inst'][0]['ietf-lmo-assets-inventory:install-location']['geolocation']['longitude']
-                co2_intensity = energymap_proxy.get_co2_intensity(device, lat, long)
-                if co2_intensity:
-                    metrics['co2_intensity'] = co2_intensity
-                elif 'avg_co2_intensity' in task_config['sites'][site]:
-                    metrics['co2_intensity'] = int(task_config['sites'][site]['avg_co2_intensity'])
-                    logger.info(f'{device} Using default CO2 intensity from config file instead')
-                else:
-                    logger.warning(f'{device} No default CO2 intensity on site {site} of config file. CO2 intensity will be set to 0.')
-
-                # Write record to DB
-                logger.debug(metrics)
-                dbcon.insert_powermetrics(customer, device, metrics)
-
-            logger.info(f"{device} completed energy and sustainability calculations")
+        while not _stop.is_set():
+            # Metrics of all devices in the batch, written to DB in one go per customer
+            pending = {}
+            for payload in messaging.consume_batch(collections_topic, 'processor', batch_size, 1.0, block = False):
+                # A malformed payload is skipped, the rest of the batch is still written
+                try:
+                    task_config = orjson.loads(payload)
+                    customer = task_config['customer']['name']
+                    loglevel = task_config['loglevel']['console']
+
+                    # Reconfigure logformat to include customer name and desired loglevel
+                    # Skipped while consecutive tasks share the same settings
+                    if (customer, loglevel) != current_logconfig:
+                        logconfig(customer, loglevel)
+                        current_logconfig = (customer, loglevel)
+
+                    task_metrics = _process_task(task_config)
+                except Exception as e:
+                    logger.error(f"Skipping collection task that failed processing {e}")
+                    continue
+
+                # Rows are grouped per customer since each customer has its own schema
+                for rows, task_rows in zip(pending.setdefault(customer, ([], [], [])), task_metrics):
+                    rows.extend(task_rows)
+
+            # Write records to DB, committing each customer's records together
+            for customer, (ifmetrics, psumetrics, powermetrics) in pending.items():
+                try:
+                    with dbcon.transaction():
+                        if ifmetrics:
+                            dbcon.insert_ifmetrics(customer, ifmetrics)
+                        if psumetrics:
+                            dbcon.insert_psumetrics(customer, psumetrics)
+                        if powermetrics:
+                            dbcon.insert_powermetrics(customer, powermetrics)
+                except Exception as e:
+                    logger.error(f"{customer} failed to commit metrics {e}")
 
     except KeyboardInterrupt as e:
         logger.info(f"Interrupt received, shutting down...")
-        messaging.shutdown()
-        sys.exit(0)
+    else:
+        logger.info(f"Termination requested, shutting down...")
+
+    messaging.shutdown()
+    applog.shutdown()
+    sys.exit(0)
 
 if __name__ == '__main__':
     main()
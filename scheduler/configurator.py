@@ -14,15 +14,22 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import functools
 import json
 import jsonschema
 import ruamel.yaml
+from collections.abc import Mapping
+from types import MappingProxyType
 from utils import secrets
 from utils.applog import logconfig, logger
 from dateutil import tz
 
 # Application configuration dict loaded from './config.yaml'
 _config = {}
+# Read-only views on the top level config sections, built once at load time
+_config_views = {}
+# Validator built for the loaded schema, reused when configuration is reloaded
+_validator = None
 
 def initialise():
     """
@@ -35,7 +42,7 @@ def initialise():
     Returns:
         None, use get_config to fetch configuration properties
     """
-    global _config
+    global _config, _config_views
 
     # Start with a baseline logger level
     logconfig()
@@ -73,14 +80,18 @@ def initialise():
     else:
         logger.info(f"Loaded application configurations")
 
+    _config_views = {k: MappingProxyType(v) if isinstance(v, Mapping) else v for k, v in _config.items()}
+
+@functools.lru_cache(maxsize = None)
 def _load_schema(schema_json):
     """
     Loads json schema describing the application configuration
     Subsequent code can assume successful validation
+    Schema ships with the image, so it is read only once per path
     Parameters:
         schema_json (string): schema file path, normally ./schema.json
     Returns:
-        schema (dict): loaded json schema dict
+        schema (dict): loaded json schema dict, shared across calls and not to be modified
         Raises an exception on failure
     """
     try:
@@ -102,7 +113,8 @@ def _load_config(config_yaml):
     """
     try:
         with open(config_yaml, 'r') as f:
-            yaml = ruamel.yaml.YAML()
+            # Safe loader is backed by libyaml, comments are only needed when writing back
+            yaml = ruamel.yaml.YAML(typ = 'safe', pure = False)
             config = yaml.load(f)
     except Exception as e:
         logger.critical(f"Failed to load configuration file {e}")
@@ -119,9 +131,12 @@ def _validate_config(schema, config):
         True on success
         Raises an exception on failure
     """
-    validator = jsonschema.Draft7Validator(schema, format_checker = jsonschema.FormatChecker())
+    global _validator
+
+    if _validator is None or _validator.schema is not schema:
+        _validator = jsonschema.Draft7Validator(schema, format_checker = jsonschema.FormatChecker())
     try:
-        validator.validate(config, schema)
+        _validator.validate(config)
     except Exception as e:
         logger.error(f"Validation failed for configuration file: {e}")
         raise e
@@ -133,8 +148,9 @@ def _validate_config(schema, config):
 
 def _update_config(config_yaml, config):
     """
-    Updates application configuration with latest contents of config dict
+    Updates application configuration with latest device credentials of config dict
     This is called to write updated password
+    File is re-read in round-trip mode so that comments and layout are preserved
     Parameters:
         config_yaml (string): Config file path, normally ./config.yaml
         config (dict): Application configuration to write
@@ -143,9 +159,16 @@ def _update_config(config_yaml, config):
         Raises an exception on failure
     """
     try:
+        yaml = ruamel.yaml.YAML()
+        with open(config_yaml, 'r') as f:
+            document = yaml.load(f)
+        for d, device_config in config['devices'].items():
+            if device_config.get('key') is None:
+                continue
+            document['devices'][d]['password'] = device_config['password']
+            document['devices'][d]['key'] = device_config['key']
         with open(config_yaml, 'w') as f:
-            yaml = ruamel.yaml.YAML()
-            yaml.dump(config, f)
+            yaml.dump(document, f)
     except Exception as e:
         logger.error(f"Failed to update configuration file {e}")
         raise e
@@ -158,11 +181,11 @@ def get_config(section):
     Parameters:
         section (string): Top level config section name 'customer', 'report', 'devices' etc
     Returns:
-        Returns copy of named section configuration
+        Returns read-only view of named section configuration, callers that modify it must copy with dict()
         None if invalid section name
     """
-    section_config = _config.get(section)
+    section_config = _config_views.get(section)
     if section_config:
-        return section_config.copy()
+        return section_config
     else:
         return None
@@ -15,14 +15,29 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
+import heapq
 import os
-import schedule
+import signal
 import sys
+import threading
 import time
 import configurator
-from utils import messaging
+from concurrent.futures import ThreadPoolExecutor
+from utils import applog, messaging
 from utils.applog import logger
 
+# Runs scheduled jobs off the event loop thread, so a slow publish does not hold back other due jobs
+_executor = ThreadPoolExecutor(max_workers = int(os.environ.get('SCHEDULER_WORKERS', 8)))
+
+# Publish arguments per device name, built once from the configuration when collections are scheduled
+_task_templates = {}
+
+# Scheduled collections, min-heap of (next run as time.monotonic() seconds, interval in seconds, device name)
+_task_queue = []
+
+# Set on SIGTERM, wakes the event loop from its sleep so it can exit
+_stop = threading.Event()
+
 def main():
     """
     Entrypoint for scheduler app
@@ -38,15 +53,28 @@ def main():
     
     _schedule_collection()
 
-    # Run event loop forever, waking up to run scheduled collections
+    # Stop on SIGTERM, then let submitted jobs finish and flush before exiting
+    signal.signal(signal.SIGTERM, _on_sigterm)
+
+    # Run event loop until stopped, waking up to run scheduled collections
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+        while not _stop.is_set():
+            _run_due_tasks()
     except KeyboardInterrupt as e:
         logger.info(f"Interrupt received, shutting down...")
-        messaging.shutdown()
-        sys.exit(0)
+    else:
+        logger.info(f"Termination requested, shutting down...")
+
+    _executor.shutdown(wait = True)
+    messaging.shutdown()
+    applog.shutdown()
+    sys.exit(0)
+
+def _on_sigterm(signum, frame):
+    """
+    SIGTERM handler (docker stop), ends the event loop
+    """
+    _stop.set()
 
 def _schedule_collection():
     """
@@ -57,41 +85,103 @@ def _schedule_collection():
         None
     """
     devices = configurator.get_config('devices')
+    _task_templates.clear()
+    _task_queue.clear()
+    now = time.monotonic()
     for device_name, device_config in devices.items():
         if device_config['collection']['enabled']:
-            schedule.every(device_config['collection']['interval']).minutes.do(_process_task, device_name)
+            _task_templates[device_name] = _build_task_template(device_name, device_config)
+            interval = device_config['collection']['interval'] * 60
+            heapq.heappush(_task_queue, (now + interval, interval, device_name))
             logger.info(f"{device_name} Collection scheduled at every {device_config['collection']['interval']} minutes")
         else:
             logger.info(f"{device_name} Collection not enabled, skipping")
             continue
     return
 
-def _process_task(task_data):
+def _run_due_tasks():
     """
-    Callback function for scheduled jobs
+    Dispatches the earliest scheduled collection if due, else sleeps until it is due
+    Sleeps are capped to a minute and cut short by a stop request
     Parameters:
         None
     Returns:
         None
     """
+    if not _task_queue:
+        _stop.wait(60)
+        return
+
+    now = time.monotonic()
+    next_run, interval, device_name = _task_queue[0]
+    if next_run > now:
+        _stop.wait(min(next_run - now, 60))
+        return
+
+    # Reschedule from now, as the collection is dispatched now
+    heapq.heapreplace(_task_queue, (now + interval, interval, device_name))
+    _submit_task(device_name)
+
+def _submit_task(task_data):
+    """
+    Hands a due collection over to the worker pool
+    Parameters:
+        task_data: device name
+    Returns:
+        None
+    """
+    future = _executor.submit(_process_task, task_data)
+    future.add_done_callback(_log_task_failure)
+
+def _log_task_failure(future):
+    """
+    Logs exceptions raised by a scheduled job on the worker pool
+    """
+    e = future.exception()
+    if e:
+        logger.error(f"Scheduled collection failed {e}")
+
+def _build_task_template(device_name, device_config):
+    """
+    Builds the collection task published for a device at every scheduled run
+    Parameters:
+        device_name: device name as in configuration
+        device_config: device configuration
+    Returns:
+        dict of topic, key and message arguments for messaging.produce
+    """
+    # get_config returns None for sections that are absent or empty
     task_config = {}
     task_config['customer'] = { 'name': 'metrics'}
-    task_config['loglevel'] = configurator.get_config('loglevel')
+    task_config['loglevel'] = dict(configurator.get_config('loglevel') or {})
 
     # add device name, configuration and connection details
-    task_config['device'] = configurator.get_config('devices')[task_data]
-    task_config['device']['name'] = task_data
-    task_config['connections'] = configurator.get_config('connections')
-    task_config['sites'] = configurator.get_config('sites')
+    task_config['device'] = {**device_config, 'name': device_name}
+    task_config['connections'] = dict(configurator.get_config('connections') or {})
+    task_config['sites'] = dict(configurator.get_config('sites') or {})
     connection_type = task_config['device']['connection']
-    topic = f"{connection_type}_schedules"
+
     # use device hostname as topic key
-    key = task_data
-    print (task_config)
-    logger.info(f"{task_config['device']['name']} Triggering collection")
+    return {
+        'topic': f"{connection_type}_schedules",
+        'key': device_name,
+        'message': task_config
+    }
+
+def _process_task(task_data):
+    """
+    Callback function for scheduled jobs
+    Parameters:
+        task_data: device name
+    Returns:
+        None
+    """
+    task = _task_templates[task_data]
+    logger.debug(task['message'])
+    logger.info(f"{task_data} Triggering collection")
 
     # publish payload on either schedules topic or reports topic
-    messaging.produce(topic = topic, key = key, message = task_config)
+    messaging.produce(**task)
     return
 
 if __name__ == '__main__':
@@ -14,86 +14,139 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
-import json
+import orjson
 import os
+import signal
 import sys
-from ssh_connection import SSH_Connection
+import threading
+import ssh_connection
 from normalisers import normaliser_factory
-from utils import messaging
+from utils import applog, messaging
 from utils.applog import logconfig, logger
 
+# Set on SIGTERM, the event loop exits once the current collection is published
+_stop = threading.Event()
+
+def _collect_device(task_config, collections_topic, batch_size):
+    """
+    Collects, normalises and publishes POWEFF data of the device in a collection task
+    Parameters:
+        task_config: decoded collection task
+        collections_topic: topic POWEFF batches are published on
+        batch_size: number of POWEFF entries per published message
+    Returns:
+        None
+        Raises an exception on malformed task
+    """
+    sites = task_config['sites']
+    device_config = task_config['device']
+    device = device_config['name']
+    conn_type = device_config['connection']
+
+    normaliser = normaliser_factory.get_normaliser(task_config)
+    if not normaliser:
+        logger.error(f"{device} Unsupported device family or connection, skipping collection")
+        return
+    commands = normaliser.get_commands()
+    logger.debug(commands)
+
+    connection = ssh_connection.get_connection(task_config)
+    if not connection:
+        logger.error(f"{device} Invalid connection configuration, skipping collection")
+        return
+
+    logger.info(f"{device} Trying to connect through {conn_type}")
+    if not connection.connect():
+        logger.error(f"{device} Failed connecting to device, skipping collection")
+        return
+    else:
+        logger.info(f"{device} Successfully connected")
+
+    logger.info(f"{device} Executing commands")
+    # Connection is kept open for the next collection of this device
+    command_data = connection.execute(commands)
+    logger.debug(command_data)
+
+    if not command_data:
+        logger.error(f"{device} Error executing commands")
+        return
+    else:
+        logger.info(f"{device} Normalising data into POWEFF model")
+
+    # Drop models that failed to build, once for all batches
+    poweff_data = [i for i in normaliser.normalise(sites, device_config, command_data) or () if i]
+    if not poweff_data:
+        logger.error(f"{device} Failed to build POWEFF model, skipping device")
+        return
+    else:
+        logger.info(f"{device} Successfully built POWEFF model")
+        logger.debug(poweff_data)
+
+    # Processor needs only these sections of the task alongside the POWEFF data
+    processing_task = {k: task_config[k] for k in ('customer', 'device', 'loglevel', 'sites')}
+    for poweff_index in range(0, len(poweff_data), batch_size):
+        batch_task = {**processing_task, 'poweff': poweff_data[poweff_index:poweff_index + batch_size]}
+        logger.info(f"{device} sending batch index {poweff_index} of POWEFF data to message queue")
+        logger.debug(batch_task)
+        messaging.produce(topic = collections_topic, key = device, message = batch_task)
+
+def _on_sigterm(signum, frame):
+    """
+    SIGTERM handler (docker stop), ends the event loop once the current collection is done
+    Nothing is raised, so a command running on a device is not interrupted halfway
+    """
+    _stop.set()
+
 def main():
 
     # Messaging topics to consume and publish
     schedules_topic = os.environ.get('SCHEDULES_TOPIC', 'ssh_schedules')
     collections_topic = os.environ.get('COLLECTIONS_TOPIC', 'collections')
     batch_size = int(os.environ.get('BATCH_SIZE', 10))
+    # Each request is a blocking SSH collection, so requests are fetched one at a time by default.
+    # Fetching more ahead risks exceeding max.poll.interval.ms, which triggers a rebalance
+    # and redelivers the same requests, collecting those devices twice
+    consume_batch_size = int(os.environ.get('CONSUME_BATCH_SIZE', 1))
 
     # Start with a baseline logger level
     logconfig(level = 'INFO')
     logger.info(f"Waiting for collection requests")
 
-    # Run event loop forever, waking up to receive collection tasks through messaging
+    # Customer and loglevel the logger is currently configured with
+    current_logconfig = None
+
+    # Stop between collections on SIGTERM, then disconnect and flush before exiting
+    signal.signal(signal.SIGTERM, _on_sigterm)
+
+    # Run event loop until stopped, waking up to receive collection tasks through messaging
     try:
-        while True:
-            payload = messaging.consume(schedules_topic, 'collector')
-            task_config = json.loads(payload)
-            customer = task_config['customer']['name']
-            sites = task_config['sites']
-            device = task_config['device']['name']
-            conn_type = task_config['device']['connection']
-            loglevel = task_config['loglevel']['console']
-
-            # Reconfigure logformat to include customer name and desired loglevel
-            logconfig(customer, loglevel)
-
-            normaliser = normaliser_factory.get_normaliser(task_config)
-            commands = normaliser.get_commands()
-            logger.debug(commands)
-
-            connection = SSH_Connection(task_config)
-            if not connection:
-                logger.error(f"{device} Invalid connection configuration, skipping collection")
-                continue
-
-            logger.info(f"{device} Trying to connect through {conn_type}")
-            if not connection.connect():
-                logger.error(f"{device} Failed connecting to device, skipping collection")
-                continue
-            else:
-                logger.info(f"{device} Successfully connected")
-
-            logger.info(f"{device} Executing commands")
-            command_data = connection.execute(commands)
-            connection.disconnect()
-            logger.debug(command_data)
-
-            if not command_data:
-                logger.error(f"{device} Error executing commands")
-                continue
-            else:
-                logger.info(f"{device} Normalising data into POWEFF model")
-                
-            poweff_data = normaliser.normalise(sites, task_config['device'], command_data)
-            if not poweff_data:
-                logger.error(f"{device} Failed to build POWEFF model, skipping device")
-                continue
-            else:
-                logger.info(f"{device} Successfully built POWEFF model")
-                logger.debug(poweff_data)
-            
-            for poweff_index in range(0, len(poweff_data), batch_size):
-                batch_task = task_config.copy()
-                batch_poweff = poweff_data[poweff_index:poweff_index + batch_size]
-                batch_task['poweff'] = list(filter(None, batch_poweff))
-                logger.info(f"{device} sending batch index {poweff_index} of POWEFF data to message queue")
-                logger.debug(batch_task)
-                messaging.produce(topic = collections_topic, key = device, message = batch_task)
-            
+        while not _stop.is_set():
+            for payload in messaging.consume_batch(schedules_topic, 'collector', consume_batch_size, 1.0, block = False):
+                # A malformed or failing task is skipped, the rest of the batch is still collected
+                try:
+                    task_config = orjson.loads(payload)
+                    customer = task_config['customer']['name']
+                    loglevel = task_config['loglevel']['console']
+
+                    # Reconfigure logformat to include customer name and desired loglevel
+                    # Skipped while consecutive tasks share the same settings
+                    if (customer, loglevel) != current_logconfig:
+                        logconfig(customer, loglevel)
+                        current_logconfig = (customer, loglevel)
+
+                    _collect_device(task_config, collections_topic, batch_size)
+                except Exception as e:
+                    logger.error(f"Skipping collection task that failed {e}")
+
     except KeyboardInterrupt as e:
         logger.info(f"Interrupt received, shutting down...")
-        messaging.shutdown()
-        sys.exit(0)
+    else:
+        logger.info(f"Termination requested, shutting down...")
+
+    ssh_connection.disconnect_all()
+    messaging.shutdown()
+    applog.shutdown()
+    sys.exit(0)
 
 if __name__ == '__main__':
     main()
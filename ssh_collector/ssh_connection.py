@@ -14,10 +14,73 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+from concurrent.futures import ThreadPoolExecutor
 from pyats import topology
 import logging
+import os
+import re
+import threading
+import time
 from utils.secrets import decrypt
 
+# Markers of a deprecated "admin show ..." form, matched without lowercasing the whole output
+_RE_WARNING = re.compile(r'warning', re.IGNORECASE)
+_RE_DEPRECATED = re.compile(r'deprecated', re.IGNORECASE)
+
+# Connections per device name, kept open and reused across scheduled collections
+_connections = {}
+# Connections unused for this many collection intervals of their device are closed,
+# so devices dropped from the schedule do not hold a vty line for the life of the collector
+_IDLE_INTERVALS = int(os.environ.get('SSH_IDLE_INTERVALS', 3))
+
+def get_connection(task_config):
+    """
+    Returns the pooled connection of the device in task_config
+    A new connection is created when the device is new or its configuration changed
+    Connections of other devices that have been idle for too long are closed
+    Parameters:
+        task_config: collection task config dict including device details
+    Returns:
+        SSH_Connection instance, connect() reuses it if it is still open
+    """
+    now = time.monotonic()
+    _evict_idle(now)
+
+    name = task_config['device']['name']
+    connection = _connections.get(name)
+    if connection is None or connection._device_config != task_config['device']:
+        if connection is not None:
+            connection.disconnect()
+        connection = _connections[name] = SSH_Connection(task_config)
+    connection._last_used = now
+    return connection
+
+def _evict_idle(now):
+    """
+    Disconnects and drops pooled connections not used for _IDLE_INTERVALS collection intervals
+    Parameters:
+        now: current time.monotonic() seconds
+    Returns:
+        None
+    """
+    for name, connection in list(_connections.items()):
+        if now - connection._last_used > connection._idle_timeout:
+            logging.info(f"{name} Closing connection idle for {int(now - connection._last_used)} seconds")
+            # dropped first, so a connection that fails to close is not retried on every collection
+            del _connections[name]
+            try:
+                connection.disconnect()
+            except Exception as e:
+                logging.error(f"{name} Failed to close idle connection {e}")
+
+def disconnect_all():
+    """
+    Disconnects all pooled connections, called on shutdown
+    """
+    for connection in _connections.values():
+        connection.disconnect()
+    _connections.clear()
+
 class SSH_Connection:
 
     def __init__(self, task_config):
@@ -30,6 +93,14 @@ class SSH_Connection:
         self._name = task_config['device']['name']
         self._type = task_config['device']['connection']
         self._device_config = self._task_config['device']
+        # Parallel CLI sessions to the device, commands run one after another unless raised
+        # Each session takes a vty line on the device
+        self._pool_size = int(os.environ.get('SSH_POOL_SIZE', 1))
+        self._reconnect_lock = threading.Lock()
+        # Seconds the pooled connection may stay unused before it is closed, see _evict_idle
+        interval = self._device_config.get('collection', {}).get('interval', 60)
+        self._idle_timeout = _IDLE_INTERVALS * interval * 60
+        self._last_used = time.monotonic()
 
     def connect(self):
         """
@@ -38,9 +109,13 @@ class SSH_Connection:
         Parameters:
             None, uses connection details from task_config 
         Results:
-            True: if connection attempt is successful
+            True: if connection attempt is successful or the connection is still open
             False otherwise
         """
+        if self._connection is not None and self._connection.is_connected():
+            logging.debug(f"{self._name} Reusing open connection")
+            return True
+
         testbed_config = {
             "devices": {
                 self._name: {
@@ -76,11 +151,14 @@ class SSH_Connection:
         testbed = topology.loader.load(testbed_config)
         self._connection = testbed.devices[self._name]
 
+        # A connection pool of more than one session lets commands run in parallel
+        pool_args = {'pool_size': self._pool_size} if self._pool_size > 1 else {}
         try:
             self._connection.connect(log_stdout = False,
                                      init_exec_commands=['terminal length 0'],
                                      init_config_commands=[],
-                                     connection_timeout=self._device_config['timeout'])
+                                     connection_timeout=self._device_config['timeout'],
+                                     **pool_args)
         except:
             self._connection = None
             return False
@@ -103,29 +181,13 @@ class SSH_Connection:
 
         try:
             timeout = self._device_config['timeout']
-            result = {}
-            for cmd in commands.keys():
-                
-                # first, try running the given command
-                logging.info(f"{self._name} Running command {commands[cmd]}")
-                try:
-                    result[cmd] = self._connection.execute(command=commands[cmd], timeout = timeout)
-                    logging.debug(result[cmd])
-                except:
-                    logging.error(
-                        f"{self._name} Failed to run command {commands[cmd]}")
-                    result[cmd] = ""
-
-                # if that failed, and is an admin command, try alternate form without admin
-                if (commands[cmd][0:6] == "admin ") and self._is_empty_show_result(result[cmd]):
-                    new_cmd = commands[cmd][6:]
-                    logging.info(
-                        f"{self._name} Running alternate command {new_cmd}")
-                    try:
-                        result[cmd] = self._connection.execute(command = new_cmd, timeout = timeout)
-                        logging.debug(result[cmd])
-                    except:
-                        logging.error(f"Failed to run command {new_cmd}")
+            if self._pool_size > 1:
+                # Each pooled session runs one command at a time, results keep the commands order
+                with ThreadPoolExecutor(max_workers = self._pool_size) as executor:
+                    outputs = executor.map(lambda command: self._execute_command(command, timeout), commands.values())
+                    result = dict(zip(commands.keys(), outputs))
+            else:
+                result = {cmd: self._execute_command(command, timeout) for cmd, command in commands.items()}
             logging.debug(result)
             return result
         except:
@@ -133,6 +195,61 @@ class SSH_Connection:
                 f"{self._name} Failed to run commands")
             return None
 
+    def _execute_command(self, command, timeout):
+        """
+        Runs a single CLI command, falling back to the form without admin for admin commands
+        Parameters:
+            command: CLI command to run
+            timeout: command timeout in seconds
+        Returns:
+            command output, empty if the command failed
+        """
+        # first, try running the given command
+        logging.info(f"{self._name} Running command {command}")
+        try:
+            result = self._run(command, timeout)
+            logging.debug(result)
+        except:
+            logging.error(
+                f"{self._name} Failed to run command {command}")
+            result = ""
+
+        # if that failed, and is an admin command, try alternate form without admin
+        if (command[0:6] == "admin ") and self._is_empty_show_result(result):
+            new_cmd = command[6:]
+            logging.info(
+                f"{self._name} Running alternate command {new_cmd}")
+            try:
+                result = self._run(new_cmd, timeout)
+                logging.debug(result)
+            except:
+                logging.error(f"Failed to run command {new_cmd}")
+        return result
+
+    def _run(self, command, timeout):
+        """
+        Runs a single command, reconnecting once if the pooled connection was dropped since the last use
+        Parameters:
+            command: CLI command to run
+            timeout: command timeout in seconds
+        Returns:
+            command output, raises the original exception if the command still cannot be run
+        """
+        connection = self._connection
+        try:
+            return connection.execute(command = command, timeout = timeout)
+        except:
+            with self._reconnect_lock:
+                # a parallel command may have reconnected in the meantime
+                if self._connection is connection:
+                    if connection is None or connection.is_connected():
+                        raise
+                    logging.warning(f"{self._name} Connection lost, reconnecting")
+                    self._connection = None
+                    if not self.connect():
+                        raise
+            return self._connection.execute(command = command, timeout = timeout)
+
     def disconnect(self):
         """
         Overrides baseclass disconnect() method
@@ -157,9 +274,8 @@ class SSH_Connection:
             True: if result contains warnings and no meaningful data
 
         """
-        show_result = show_result.lower()
         if len(show_result) < 150:
             return True
-        if ("warning" in show_result and "deprecated" in show_result):
+        if _RE_WARNING.search(show_result) and _RE_DEPRECATED.search(show_result):
             return True
         return False
@@ -14,43 +14,82 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 # uses the root logger
 logger = logging.getLogger()
 
+# Customer name stamped on each record when it is logged, see logconfig
+_customer = 'System'
+# Writes queued records to the console on a background thread
+_listener = None
+
+class _CustomerFilter(logging.Filter):
+    """
+    Stamps records with the customer configured at the time they are logged,
+    so records still queued when the customer changes keep their own name
+    """
+    def filter(self, record):
+        record.customer = _customer
+        return True
+
 def logconfig(customer = 'System', level = 'INFO'):
     """
     Configures the logging format and level
+    Console output is written by a queue listener thread, so logging calls do not block on I/O
+    Handlers and format are set up on the first call, later calls only switch customer and level
     Parameters:
         customer (string): customer name or defaults to 'System'
         level (string): One of OFF, ERROR, INFO, DEBUG. Defaults to INFO
     Returns:
         logger (logging.Logger) logger instance for the app
     """
-    global logger
+    global _customer, _listener
 
-    # reset logging levels, this works only the first time
-    logging.basicConfig(level=logging.NOTSET)
+    if _listener is None:
+        # reuse the console handler if one is already set, else create one
+        if len(logger.handlers) == 0:
+            console = logging.StreamHandler()
+        else:
+            console = logger.handlers[0]
+            logger.removeHandler(console)
+        console.setLevel(logging.NOTSET)
+        console.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(filename)s:%(lineno)s %(customer)s %(message)s",
+                                               datefmt='%d-%b-%y %H:%M:%S'))
 
-    # fetch handler if already set, else create one
-    if len(logger.handlers) == 0:
-        console = logging.StreamHandler()
-        logger.addHandler(console)
-    else:
-        console = logger.handlers[0]
-    
-    format = logging.Formatter(f"%(asctime)s %(levelname)s %(filename)s:%(lineno)s {customer} %(message)s", datefmt='%d-%b-%y %H:%M:%S')
-    console.setFormatter(format)
+        handler = QueueHandler(queue.SimpleQueue())
+        handler.addFilter(_CustomerFilter())
+        logger.addHandler(handler)
+        _listener = QueueListener(handler.queue, console)
+        _listener.start()
+        # drain queued records on exit, apps also call shutdown() from their shutdown path
+        atexit.register(shutdown)
+
+    _customer = customer
 
     # Python logger does not have OFF level.
     # If the user intends to turns off logging altogether,
     # then set the log threshold to +1 more than the highest loglevel
     # Else set the desired log level
+    # Level is applied on the logger, so filtered out records are never queued or formatted
     if 'OFF' == level:
         log_level = logging.CRITICAL + 1
     else:
         log_level = logging.getLevelName(level)
-    console.setLevel(log_level)
+    logger.setLevel(log_level)
 
     return logger
+
+def shutdown():
+    """
+    Stops the queue listener, writing out records still queued
+    Safe to call more than once, it also runs at exit
+    """
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -14,29 +14,254 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import io
 import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from functools import lru_cache
 import psycopg2
+from cachetools import TTLCache
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
 from utils.applog import logger
 
-cnxn = None
+# Connections are leased per operation through get_cursor(), or per block through transaction()
+_pool = None
+_pool_lock = threading.Lock()
+# Per thread state, the connection of the transaction() block the thread is in and the reusable COPY buffer
+_local = threading.local()
+# Plain cursor of each pooled connection, reused by every operation leasing that connection
+# Cursors reference their connection, so entries are removed explicitly when a connection is closed
+_cursors = {}
+# When each pooled connection was last returned, connections idle for longer than
+# _PING_AFTER_IDLE seconds are checked before reuse as firewalls may have dropped them
+_last_used = weakref.WeakKeyDictionary()
+_PING_AFTER_IDLE = 60
+
+# Integer columns of powermetrics, in table column order after timestamp, site, hostname and family
+_POWERMETRICS_INT_COLUMNS = ('power_in', 'power_out', 'power_efficiency', 'power_available', 'power_utilization',
+                             'traffic_in', 'traffic_out', 'traffic_efficiency', 'temperature', 'cpu_usage',
+                             'memory_usage', 'co2_intensity')
+_PSUMETRICS_COLUMNS = ('timestamp', 'hostname', 'psuname', 'power_in', 'power_out', 'power_efficiency')
+_IFMETRICS_COLUMNS = ('timestamp', 'hostname', 'ifname', 'bandwidth', 'data_in', 'data_out', 'utilization')
+# (serial, pid) rows last confirmed in the assets table, per (customer, hostname)
+# Entries may be stale if the table is changed outside this process, so they expire and
+# the DB is checked again at least every ASSETS_CACHE_TTL seconds, bounded for many devices
+_stored_assets = TTLCache(maxsize = 4096, ttl = int(os.environ.get('ASSETS_CACHE_TTL', 3600)))
+# Keys of fetch_powermetrics records, in query column order
+_POWERMETRICS_FETCH_KEYS = ('timestamp', 'site', 'family', 'hostname', 'power_in', 'power_efficiency',
+                            'power_utilization', 'traffic_efficiency', 'temperature', 'cpu', 'memory',
+                            'co2_intensity', 'co2_emission')
+# Batches of at least this many rows are streamed with COPY, smaller ones go as a single INSERT
+_COPY_MIN_ROWS = 500
+# Size in characters above which the reusable COPY buffer is dropped rather than kept for the next batch
+_COPY_BUFFER_SOFT_MAX = 1024 * 1024
 
 def connect():
-    global cnxn
+    """
+    Creates the database connection pool on first use
+    Pool size is bounded by DBPOOL_SIZE, defaults to 10
+    Returns:
+        ThreadedConnectionPool
+        Exception on failure
+    """
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                dbuser = os.environ.get('DBUSER', 'susit')
+                dbpass = os.environ.get('DBPASS')
+                dbhost = os.environ.get('DBHOST', 'localhost')
+                dbport = os.environ.get('DBPORT', '5432')
+                dbname = os.environ.get('DBNAME', 'susit')
+                maxconn = int(os.environ.get('DBPOOL_SIZE', 10))
+
+                try:
+                    dbstr = f"postgres://{dbuser}:{dbpass}@{dbhost}:{dbport}/{dbname}"
+                    # TCP keepalives keep idle connections open through NAT and notice dead peers
+                    _pool = ThreadedConnectionPool(1, maxconn, dbstr, connect_timeout = 5, application_name = 'susit',
+                                                   keepalives = 1, keepalives_idle = 30, keepalives_interval = 10,
+                                                   keepalives_count = 3)
+                    logger.info("Connected to database %s", dbname)
+                except (Exception, psycopg2.DatabaseError) as e:
+                    raise e
+    return _pool
+
+def _shared_cursor(conn):
+    """
+    Returns the reusable cursor of a connection, opening it on first use or after it was closed
+    """
+    cursor = _cursors.get(conn)
+    if cursor is None or cursor.closed:
+        cursor = _cursors[conn] = conn.cursor()
+    return cursor
+
+def _lease(pool):
+    """
+    Takes a connection from the pool, replacing connections that were dropped while idle
+    Returns:
+        open connection
+    """
+    while True:
+        conn = pool.getconn()
+        if not conn.closed:
+            idle_since = _last_used.get(conn)
+            if idle_since is None or time.monotonic() - idle_since < _PING_AFTER_IDLE:
+                return conn
+            try:
+                _shared_cursor(conn).execute("SELECT 1")
+                return conn
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                pass
+        logger.warning("Reconnecting stale database connection")
+        _discard(pool, conn)
 
-    if not cnxn:
-        dbuser = os.environ.get('DBUSER', 'susit')
-        dbpass = os.environ.get('DBPASS')
-        dbhost = os.environ.get('DBHOST', 'localhost')
-        dbport = os.environ.get('DBPORT', '5432')
-        dbname = os.environ.get('DBNAME', 'susit')
+def _discard(pool, conn):
+    """
+    Closes a connection and drops it from the pool along with its reusable cursor
+    """
+    _cursors.pop(conn, None)
+    _last_used.pop(conn, None)
+    pool.putconn(conn, close = True)
+
+def _release(pool, conn):
+    """
+    Returns a connection to the pool, closing it if it is broken
+    """
+    if conn.closed:
+        _discard(pool, conn)
+    else:
+        _last_used[conn] = time.monotonic()
+        pool.putconn(conn)
 
+@contextmanager
+def get_cursor(name = None):
+    """
+    Leases a pooled connection for one operation
+    Commits when the block completes, rolls back if it raises
+    Broken connections are dropped from the pool instead of being handed out again
+    Inside a transaction() block the operation runs on that block's connection within a savepoint,
+    so a failed operation is undone without aborting the rest of the transaction
+    Parameters:
+        name: optional, opens a server side cursor with this name to stream large results
+    Returns:
+        cursor on the leased connection, plain cursors are shared across operations and must not be closed
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        control = _shared_cursor(conn)
+        cursor = control if name is None else conn.cursor(name = name)
         try:
-            dbstr = f"postgres://{dbuser}:{dbpass}@{dbhost}:{dbport}/{dbname}"
-            cnxn = psycopg2.connect(dbstr)
-            logger.info(f"Connected to database {dbname}")
-        except (Exception, psycopg2.DatabaseError) as e:
-            raise e
-    return cnxn
+            control.execute("SAVEPOINT operation")
+            try:
+                yield cursor
+            except BaseException:
+                if not conn.closed:
+                    control.execute("ROLLBACK TO SAVEPOINT operation")
+                raise
+            control.execute("RELEASE SAVEPOINT operation")
+        finally:
+            if cursor is not control:
+                cursor.close()
+        return
+
+    pool = connect()
+    conn = _lease(pool)
+    try:
+        if name is None:
+            yield _shared_cursor(conn)
+        else:
+            with conn.cursor(name = name) as cursor:
+                yield cursor
+        conn.commit()
+    except BaseException:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        _release(pool, conn)
+
+@contextmanager
+def transaction():
+    """
+    Groups the database operations of the calling thread into a single transaction
+    Committed once when the block completes, rolled back if it raises
+    Nested blocks join the outer transaction
+    Returns:
+        connection the transaction runs on
+    """
+    if getattr(_local, 'conn', None) is not None:
+        yield _local.conn
+        return
+
+    pool = connect()
+    conn = _local.conn = _lease(pool)
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        _local.conn = None
+        _release(pool, conn)
+
+@lru_cache(maxsize = 64)
+def _schema(customer):
+    """
+    Quoted identifier of a customer schema for composing queries with psycopg2.sql
+    Schemas are created with unquoted names, which Postgres folds to lower case
+    """
+    return sql.Identifier(customer.lower())
+
+def _pg_int(value):
+    """
+    Rounds a metric for an INTEGER column, COPY does not cast fractional input the way INSERT does
+    """
+    return None if value is None else int(round(value))
+
+def _csv_field(value):
+    """
+    Formats a value as a COPY CSV field
+    Strings are always quoted, so that only None is written as the unquoted empty field COPY reads as NULL
+    """
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+def _copy_rows(cursor, table, columns, rows):
+    """
+    Streams rows into a table with COPY FROM STDIN in CSV format
+    Parameters:
+        cursor: open cursor
+        table: schema qualified table name
+        columns: column names, in the order of row values
+        rows: iterable of row tuples, None is written as NULL and '' as an empty string
+    Returns:
+        None
+    """
+    # CSV buffer is kept per thread and reused across batches
+    buffer = getattr(_local, 'copy_buffer', None)
+    if buffer is None:
+        buffer = _local.copy_buffer = io.StringIO()
+    try:
+        buffer.writelines(','.join(map(_csv_field, row)) + '\n' for row in rows)
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        # an unusually large batch does not pin its memory, the next one starts with a fresh buffer
+        if buffer.tell() > _COPY_BUFFER_SOFT_MAX:
+            _local.copy_buffer = None
+        else:
+            buffer.seek(0)
+            buffer.truncate()
 
 def fetch_assets(customer, hostname):
     """
@@ -57,19 +282,16 @@ def fetch_assets(customer, hostname):
     """
     assets = []
     try:
-        connect()
-        cursor = cnxn.cursor()
-        cursor.execute(
-            f"SELECT serial, pid from {customer}.assets WHERE hostname = '{hostname}'")
-        results = cursor.fetchall()
-        for i in results:
-            assets.append(
-                dict([('hostname', hostname), ('serial', i[0]), ('pid', i[1])]))
+        with get_cursor() as cursor:
+            cursor.execute(
+                sql.SQL("SELECT serial, pid from {}.assets WHERE hostname = %s").format(_schema(customer)),
+                (hostname,))
+            results = cursor.fetchall()
+            for i in results:
+                assets.append(
+                    dict([('hostname', hostname), ('serial', i[0]), ('pid', i[1])]))
     except (Exception, psycopg2.DatabaseError) as e:
-            logger.error(f"{hostname} failed to fetch assets details {e}")
-            cnxn.rollback()
-    finally:
-        cursor.close()
+            logger.error("%s failed to fetch assets details %s", hostname, e)
     return assets
 
 def insert_assets(customer, hostname, assets):
@@ -91,42 +313,44 @@ def insert_assets(customer, hostname, assets):
         Exception on failure
     """
 
+    # skip without a DB round trip if this process recently stored the same assets
+    # allowed to be stale until the entry expires, see _stored_assets
+    rows = tuple((i['serial'], i['pid']) for i in assets)
+    if assets and _stored_assets.get((customer, hostname)) == rows:
+        return
+
     # if matching values already exist, then skip
     existing = fetch_assets(customer, hostname)
     if assets and assets == existing:
+        _stored_assets[(customer, hostname)] = rows
         return
 
     try:
-        connect()
-        cursor = cnxn.cursor()
+        with get_cursor() as cursor:
 
-        # this table needs to hold only the latest entries
-        # in the rare event of new assets getting added, then
-        # delete all entries and then insert, rather than selecting updates and deletes
-        if existing:
-            cursor.execute(
-                f"DELETE FROM {customer}.assets WHERE hostname = '{hostname}'")
+            # this table needs to hold only the latest entries
+            # in the rare event of new assets getting added, then
+            # delete all entries and then insert, rather than selecting updates and deletes
+            if existing:
+                cursor.execute(
+                    sql.SQL("DELETE FROM {}.assets WHERE hostname = %s").format(_schema(customer)),
+                    (hostname,))
             
-        # insert new values
-        values = ','.join(cursor.mogrify('(%s, %s, %s)', (hostname, i['serial'], i['pid'])).decode('utf-8') for i in assets)
-        cursor.execute(
-            f"INSERT INTO {customer}.assets (hostname, serial, pid) VALUES {values}")
-        cnxn.commit()
+            # insert new values, streamed a page at a time
+            execute_values(cursor, sql.SQL("INSERT INTO {}.assets (hostname, serial, pid) VALUES %s").format(_schema(customer)),
+                           ((hostname, serial, pid) for serial, pid in rows), page_size=500)
+        _stored_assets[(customer, hostname)] = rows
     except (Exception, psycopg2.DatabaseError) as e:
-        logger.error(f"{hostname} failed to insert assets details {e}")
-        logger.error(f"{hostname} attempted to insert {assets}")
-        cnxn.rollback()
-    finally:
-        cursor.close()
+        logger.error("%s failed to insert assets details %s", hostname, e)
+        logger.debug("%s attempted to insert %s", hostname, assets)
     return
 
-def insert_psumetrics(customer, hostname, metrics):
+def insert_psumetrics(customer, metrics):
     """
     Inserts PSU metrics to psumetrics timeseries table in customer schema
     Parameters:
         customer: customer name/schema to insert to
-        hostname: device hostname
-        metrics: array of psu metrics in the form
+        metrics: array of psu metrics of one or more devices in the form
             [
                 {
                     'timestamp': timestamp with timezone
@@ -141,29 +365,27 @@ def insert_psumetrics(customer, hostname, metrics):
         Exception on failure
     """
     try:
-        connect()
-        cursor = cnxn.cursor()
-        values = ','.join(cursor.mogrify(
-            '(%s, %s, %s, %s, %s, %s)', (
-                i['timestamp'], hostname, i['psuname'],i['power_in'], i['power_out'], i['power_efficiency']
-            )).decode('utf-8') for i in metrics)
-        cursor.execute(f"INSERT INTO {customer}.psumetrics VALUES {values}")
-        cnxn.commit()
+        with get_cursor() as cursor:
+            if len(metrics) >= _COPY_MIN_ROWS:
+                _copy_rows(cursor, f"{customer}.psumetrics", _PSUMETRICS_COLUMNS, ((
+                        i['timestamp'], i['hostname'], i['psuname'], _pg_int(i['power_in']), _pg_int(i['power_out']),
+                        _pg_int(i['power_efficiency'])
+                    ) for i in metrics))
+            else:
+                execute_values(cursor, f"INSERT INTO {customer}.psumetrics VALUES %s", [(
+                        i['timestamp'], i['hostname'], i['psuname'],i['power_in'], i['power_out'], i['power_efficiency']
+                    ) for i in metrics], page_size=1000)
     except (Exception, psycopg2.DatabaseError) as e:
-        logger.error(f"{hostname} failed to insert psu metrics {e}")
-        logger.error(f"{hostname} attempted to insert {metrics}")
-        cnxn.rollback()
-    finally:
-        cursor.close()
+        logger.error("%s failed to insert psu metrics %s", customer, e)
+        logger.debug("%s attempted to insert %s", customer, metrics)
     return
 
-def insert_ifmetrics(customer, hostname, metrics):
+def insert_ifmetrics(customer, metrics):
     """
     Inserts Interface metrics to ifmetrics timeseries table in customer schema
     Parameters:
         customer: customer name/schema to insert to
-        hostname: device hostname
-        metrics: array of interface metrics in the form
+        metrics: array of interface metrics of one or more devices in the form
             [
                 {
                     'timestamp': timestamp with timezone
@@ -180,20 +402,19 @@ def insert_ifmetrics(customer, hostname, metrics):
         Exception on failure
     """
     try:
-        connect()
-        cursor = cnxn.cursor()
-        values = ','.join(cursor.mogrify(
-            '(%s, %s, %s, %s, %s, %s, %s)', (
-                i['timestamp'], hostname, i['ifname'],i['bandwidth'], i['traffic_in'], i['traffic_out'], i['utilization']
-            )).decode('utf-8') for i in metrics)
-        cursor.execute(f"INSERT INTO {customer}.ifmetrics VALUES {values}")
-        cnxn.commit()
+        with get_cursor() as cursor:
+            if len(metrics) >= _COPY_MIN_ROWS:
+                _copy_rows(cursor, f"{customer}.ifmetrics", _IFMETRICS_COLUMNS, ((
+                        i['timestamp'], i['hostname'], i['ifname'], _pg_int(i['bandwidth']), _pg_int(i['traffic_in']),
+                        _pg_int(i['traffic_out']), _pg_int(i['utilization'])
+                    ) for i in metrics))
+            else:
+                execute_values(cursor, f"INSERT INTO {customer}.ifmetrics VALUES %s", [(
+                        i['timestamp'], i['hostname'], i['ifname'],i['bandwidth'], i['traffic_in'], i['traffic_out'], i['utilization']
+                    ) for i in metrics], page_size=1000)
     except (Exception, psycopg2.DatabaseError) as e:
-        logger.error(f"{hostname} failed to insert interface metrics {e}")
-        logger.error(f"{hostname} attempted to insert {metrics}")
-        cnxn.rollback()
-    finally:
-        cursor.close()
+        logger.error("%s failed to insert interface metrics %s", customer, e)
+        logger.debug("%s attempted to insert %s", customer, metrics)
     return
 
 def fetch_powermetrics(customer, site, duration):
@@ -205,7 +426,8 @@ def fetch_powermetrics(customer, site, duration):
         duration: query duration in number of days
         timezone: timezone of the site
     Returns:
-        assets: array of assets in the form, time bucketed into 1hr each
+        generator of metrics in the form, time bucketed into 1hr each
+        rows are streamed from a server side cursor as the caller iterates
             [
                 {
                     'timestamp': timebucket
@@ -225,68 +447,61 @@ def fetch_powermetrics(customer, site, duration):
             ]
         Exception on failure
     """
-    metrics = []
     try:
-        connect()
-        cursor = cnxn.cursor()
-        cursor.execute(
-            f"""
-            SELECT time_bucket_gapfill('1 hour', timestamp) as bucket,
-            site,
-            family,
-            hostname,
-            locf(avg(power_in)) as power_in,
-            locf(avg(power_efficiency)) as power_efficiency,
-            locf(avg(power_utilization)) as power_utilization,
-            locf(avg(traffic_efficiency)) as traffic_efficiency,
-            max(temperature) as temperature,
-            max(cpu_usage) as cpu,
-            max(memory_usage) as memory,
-            locf(avg(co2_intensity)) as co2_intensity
-            FROM {customer}.powermetrics
-            WHERE site = '{site}'
-            AND timestamp < NOW()
-            AND timestamp > NOW() - INTERVAL '{duration} days'
-            GROUP BY bucket, site, family, hostname
-            ORDER BY hostname, bucket ASC;
-            """)
-        results = cursor.fetchall()
-        for i in results:
-            metrics.append(
-                dict([
-                    ('timestamp', i[0]),
-                    ('site', i[1]),
-                    ('family', i[2]),
-                    ('hostname', i[3]),
-                    ('power_in', i[4]/1000 if i[4] else None),
-                    ('power_efficiency', i[5]),
-                    ('power_utilization', i[6]),
-                    ('traffic_efficiency', i[7]/1000 if i[7] else None),
-                    ('temperature', i[8]),
-                    ('cpu', i[9]),
-                    ('memory', i[10]),
-                    ('co2_intensity', i[11]),
-                    ('co2_emission', (i[4]/1000 * i[11]) if i[4] and i[11] else None)
-                ]))
+        with get_cursor(name = 'powermetrics') as cursor:
+            cursor.itersize = 10000
+            # kW conversions and emission are computed by the server, rows only need to be mapped to keys
+            # zero and missing averages are both reported as None
+            cursor.execute(sql.SQL(
+                """
+                SELECT bucket, site, family, hostname,
+                NULLIF(power_in, 0) / 1000 as power_in,
+                power_efficiency,
+                power_utilization,
+                NULLIF(traffic_efficiency, 0) / 1000 as traffic_efficiency,
+                temperature,
+                cpu,
+                memory,
+                co2_intensity,
+                NULLIF(power_in, 0) / 1000 * NULLIF(co2_intensity, 0) as co2_emission
+                FROM (
+                    SELECT time_bucket_gapfill('1 hour', timestamp) as bucket,
+                    site,
+                    family,
+                    hostname,
+                    locf(avg(power_in)) as power_in,
+                    locf(avg(power_efficiency)) as power_efficiency,
+                    locf(avg(power_utilization)) as power_utilization,
+                    locf(avg(traffic_efficiency)) as traffic_efficiency,
+                    max(temperature) as temperature,
+                    max(cpu_usage) as cpu,
+                    max(memory_usage) as memory,
+                    locf(avg(co2_intensity)) as co2_intensity
+                    FROM {}.powermetrics
+                    WHERE site = %s
+                    AND timestamp < NOW()
+                    AND timestamp > NOW() - %s * INTERVAL '1 day'
+                    GROUP BY bucket, site, family, hostname
+                ) buckets
+                ORDER BY hostname, bucket ASC
+                """).format(_schema(customer)), (site, duration))
+            for row in cursor:
+                yield dict(zip(_POWERMETRICS_FETCH_KEYS, row))
     except (Exception, psycopg2.DatabaseError) as e:
-            logger.error(f"{site} failed to fetch power metrics {e}")
-            cnxn.rollback()
-    finally:
-        cursor.close()
-    return metrics
+            logger.error("%s failed to fetch power metrics %s", site, e)
 
-def insert_powermetrics(customer, hostname, metrics):
+def insert_powermetrics(customer, metrics):
     """
     Inserts power metrics to powermetrics timeseries table in customer schema
     Parameters:
         customer: customer name/schema to insert to
-        hostname: device hostname
-        metrics: array of interface metrics in the form
+        metrics: array of power metrics of one or more devices in the form
             [
                 {
                     'timestamp': timestamp with timezone
                     'site': site name
                     'hostname': device name
+                    'family': device family
                     'power_in': integer, power input in watts
                     'power_out': integer, power output in watts
                     'power_efficiency': integer, power output in watts
@@ -306,39 +521,47 @@ def insert_powermetrics(customer, hostname, metrics):
         Exception on failure
     """
     try:
-        connect()
-        cursor = cnxn.cursor()
-        values = cursor.mogrify('(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)', list(metrics.values())).decode('utf-8')
-        cursor.execute(f"INSERT INTO {customer}.powermetrics VALUES {values}")
-        cnxn.commit()
+        with get_cursor() as cursor:
+            _copy_rows(cursor, f"{customer}.powermetrics",
+                       ('timestamp', 'site', 'hostname', 'family') + _POWERMETRICS_INT_COLUMNS,
+                       ((i['timestamp'], i['site'], i['hostname'], i['family'],
+                         *(_pg_int(i[c]) for c in _POWERMETRICS_INT_COLUMNS)) for i in metrics))
     except (Exception, psycopg2.DatabaseError) as e:
-        logger.error(f"{hostname} failed to insert power metrics {e}")
-        logger.error(f"{hostname} attempted to insert {metrics}")
-        cnxn.rollback()
-    finally:
-        cursor.close()
+        logger.error("%s failed to insert power metrics %s", customer, e)
+        logger.debug("%s attempted to insert %s", customer, metrics)
     return
 
 def fetch_psu_specs(hostname, pidlist):
-    specs = []
+    """
+    Reads power specifications of the given PSU PIDs from the common schema
+    Parameters:
+        hostname: device hostname, for logging
+        pidlist: list of PSU product IDs
+    Returns:
+        specs: dict of the PIDs found in the DB, keyed by PID
+            {
+                pid: {
+                    'nominal_power': integer, nominal output power in watts
+                    'available_power': integer, available output power in watts
+                    'efficiency': integer, psu efficiency in percentage
+                }
+            }
+        None on failure, so callers can tell a failed lookup from PIDs missing in the DB
+    """
+    specs = {}
 
     if not pidlist:
-        return []
+        return specs
 
     try:
-        connect()
-        cursor = cnxn.cursor()
-        cursor.execute(
-            f"SELECT pid, nominal_power, available_power, efficiency from common.psu WHERE pid = ANY (%s)", (pidlist,))
-        results = cursor.fetchall()
-        for i in results:
-            specs.append(
-                dict([('pid', i[0]), ('nominal_power', i[1]), ('available_power', i[2]), ('efficiency', i[3])]))
+        with get_cursor() as cursor:
+            cursor.execute(
+                "SELECT pid, nominal_power, available_power, efficiency from common.psu WHERE pid = ANY (%s)", (pidlist,))
+            specs = {i[0]: {'nominal_power': i[1], 'available_power': i[2], 'efficiency': i[3]}
+                     for i in cursor.fetchall()}
     except (Exception, psycopg2.DatabaseError) as e:
-            logger.error(f"{hostname} failed to fetch PSU specs {e}")
-            cnxn.rollback()
-    finally:
-        cursor.close()
+            logger.error("%s failed to fetch PSU specs %s", hostname, e)
+            return None
     return specs
 
 def fetch_module_specs(pids):
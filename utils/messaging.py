@@ -15,37 +15,71 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from confluent_kafka import Producer, Consumer
-import json
+import orjson
 import os
 import logging
+import threading
 
 _producer = _consumer = None
+# Guards lazy creation of the producer, which may be shared by worker threads
+_producer_lock = threading.Lock()
 
+def _on_delivery(error, message):
+    """
+    Delivery report callback, served from poll() and flush()
+    """
+    if error is not None:
+        logging.error(f"Failed to deliver message to {message.topic()} {error}")
 
 def produce(topic, key, message):
 
     global _producer
 
     if _producer is None:
-        kafka_config = {}
-        kafka_config['bootstrap.servers'] = os.environ.get('BOOTSTRAP_SERVERS', 'localhost:29092')
-        _producer = Producer(kafka_config)
+        with _producer_lock:
+            if _producer is None:
+                kafka_config = {}
+                kafka_config['bootstrap.servers'] = os.environ.get('BOOTSTRAP_SERVERS', 'localhost:29092')
+                # Let librdkafka coalesce messages into fewer, compressed produce requests
+                kafka_config['linger.ms'] = int(os.environ.get('PRODUCER_LINGER_MS', 20))
+                kafka_config['batch.size'] = 262144
+                kafka_config['compression.type'] = 'lz4'
+                kafka_config['queue.buffering.max.messages'] = 200000
+                _producer = Producer(kafka_config)
 
+    value = orjson.dumps(message)
     try:
-        _producer.produce(topic, key = key, value = json.dumps(message))
+        try:
+            _producer.produce(topic, key = key, value = value, on_delivery = _on_delivery)
+        except BufferError:
+            # Local queue is full, wait for in-flight deliveries to drain and retry once
+            _producer.poll(1)
+            _producer.produce(topic, key = key, value = value, on_delivery = _on_delivery)
     except Exception as e:
         logging.error(f"Failed to publish to message queue {topic}")
         raise e
 
+    # Serve delivery reports without blocking
+    _producer.poll(0)
+
     return True
 
-def shutdown():
+def flush(timeout = 10):
+    """
+    Waits up to timeout seconds for queued messages to be delivered
+    Returns:
+        number of messages still queued
+    """
     if _producer:
-        _producer.flush()
+        return _producer.flush(timeout)
+    return 0
+
+def shutdown():
+    flush()
     if _consumer:
         _consumer.close()
 
-def consume(topic, group):
+def _get_consumer(topic, group):
 
     global _consumer
 
@@ -60,16 +94,41 @@ def consume(topic, group):
         _consumer = Consumer(props)
         _consumer.subscribe([topic])
 
+    return _consumer
+
+def consume(topic, group):
+    """
+    Blocks until a message is available and returns it decoded
+    Kept for callers that handle one message at a time, see consume_batch
+    """
+    return consume_batch(topic, group, max_messages = 1)[0].decode('utf-8')
+
+def consume_batch(topic, group, max_messages = 100, timeout = 1.0, block = True):
+    """
+    Blocks until at least one message is available and returns
+    up to max_messages of them fetched in a single call
+    Parameters:
+        topic: topic to subscribe to
+        group: consumer group id
+        max_messages: upper bound of messages returned
+        timeout: seconds to wait for a batch to fill before returning what is available
+        block: if False, returns after timeout even if no message arrived, so callers can check for shutdown
+    Returns:
+        list of message values as bytes, orjson.loads parses them without decoding to str first
+        empty if block is False and no message arrived
+    """
+    consumer = _get_consumer(topic, group)
+
     try:
         while True:
-            message = _consumer.poll(timeout = 1)
-            if message is None:
-                continue
-
-            if message.error():
-                logging.error(f"error {message.error()}")
-                continue
-            return message.value().decode('utf-8')
+            payloads = []
+            for message in consumer.consume(num_messages = max_messages, timeout = timeout):
+                if message.error():
+                    logging.error(f"error {message.error()}")
+                    continue
+                payloads.append(message.value())
+            if payloads or not block:
+                return payloads
     except Exception as e:
         logging.error(f"Could not fetch from message queue {topic}")
         raise e
@@ -14,8 +14,16 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+from functools import lru_cache
 from cryptography.fernet import Fernet
 
+@lru_cache(maxsize = 1024)
+def _fernet(key):
+  """
+  Fernet instance of a key, shared by every decrypt with that key
+  """
+  return Fernet(key)
+
 def encrypt(secret):
   """
   Encrypts given secrets, generates encryption key
@@ -46,7 +54,7 @@ def decrypt(secret, key):
   if secret is None or key is None:
      return None
     
-  fernet = Fernet(key)
+  fernet = _fernet(key)
   try:
       decrypted = fernet.decrypt(secret.encode()).decode()
   except: